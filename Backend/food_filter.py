@@ -0,0 +1,106 @@
+# food_filter.py
+import threading
+from Backend.Backend import DIETARY_FOOD_PREFERENCES
+from Backend.food_loader import get_food_catalog
+
+# ----- Bitmask food filtering ----- #
+# Every allergen and food category gets one bit. Each food is a single int
+# (its allergen bits | its category bit) and each user a "forbidden" int
+# (their allergy bits | the bits of categories their diet rules out), so a
+# food is safe when food_mask & forbidden == 0.
+
+_bits = {}
+_bits_lock = threading.Lock()
+
+
+def _normalize(name):
+    return str(name).strip().lower()
+
+
+def _bit(kind, name):
+    key = (kind, _normalize(name))
+    with _bits_lock:
+        if key not in _bits:
+            _bits[key] = 1 << len(_bits)
+        return _bits[key]
+
+
+def food_mask(food):
+    mask = _bit("category", food.get("category", ""))
+    for allergen in food.get("allergens", []):
+        mask |= _bit("allergen", allergen)
+    return mask
+
+
+def get_dietary_restrictions(user):
+    """Restrictions from the profile and from settings (list or comma string)."""
+    restrictions = list(user.get("dietary_restrictions", []))
+    from_settings = user.get("preferences", {}).get("dietary_restrictions", [])
+    if isinstance(from_settings, str):
+        from_settings = from_settings.split(",")
+    restrictions += from_settings
+    return sorted({_normalize(r) for r in restrictions if str(r).strip()})
+
+
+def user_forbidden_mask(user, categories):
+    """Bits a safe food must not have, given the categories present in the catalog."""
+    mask = 0
+    for allergy in user.get("allergies", []):
+        mask |= _bit("allergen", allergy)
+
+    allowed = None
+    for restriction in get_dietary_restrictions(user):
+        if restriction in DIETARY_FOOD_PREFERENCES:
+            rule = set(DIETARY_FOOD_PREFERENCES[restriction])
+            allowed = rule if allowed is None else allowed & rule
+
+    if allowed is not None:
+        for category in {_normalize(c) for c in categories}:
+            if category not in allowed:
+                mask |= _bit("category", category)
+
+    return mask
+
+
+# ----- Cached per catalog / per user ----- #
+
+_masks = {"stamp": object(), "rows": []}
+_safe_foods = {}
+_cache_lock = threading.Lock()
+
+
+def _catalog_masks(catalog):
+    with _cache_lock:
+        if _masks["stamp"] != catalog.stamp:
+            _masks["rows"] = [(food_mask(f), f) for f in catalog.foods]
+            _masks["stamp"] = catalog.stamp
+            _safe_foods.clear()
+        return _masks["rows"]
+
+
+def get_safe_foods(user, catalog=None):
+    """
+    Foods that contain none of the user's allergens and fit their dietary
+    restrictions. Cached until the user's profile or the inventory changes.
+    """
+    catalog = catalog or get_food_catalog()
+    rows = _catalog_masks(catalog)
+
+    profile = (
+        tuple(sorted(_normalize(a) for a in user.get("allergies", []))),
+        tuple(get_dietary_restrictions(user))
+    )
+    key = (user.get("role"), user.get("id"))
+
+    with _cache_lock:
+        cached = _safe_foods.get(key)
+        if cached and cached[0] == profile:
+            return cached[1]
+
+    forbidden = user_forbidden_mask(user, catalog.by_category)
+    safe = [food for mask, food in rows if mask & forbidden == 0]
+
+    with _cache_lock:
+        if _masks["stamp"] == catalog.stamp:
+            _safe_foods[key] = (profile, safe)
+    return safe
@@ -1,31 +1,90 @@
 # food_loader.py
 import json
+import threading
+from Backend.storage import load_inventory, inventory_stamp
 
-def load_foods(path="data/sample_food.json"):
+
+def _food_from_item(item, position):
+    product = item["product"]
+
+    return {
+        "id": item.get("id", position),
+        "name": product["name"],
+        "calories": product["calories"],
+        "protein": product.get("protein", 0),
+        "cholesterol": product.get("cholesterol", 0),
+        "sugar": product.get("sugar", 0),
+        "sodium": product.get("sodium", 0),
+        "category": product["category"],
+        "allergens": product.get("allergens", []),
+        "barcode": item.get("barcode"),
+        "quantity": item.get("quantity"),
+        "expiration_date": item.get("expiration_date")
+    }
+
+
+class FoodCatalog:
+    """Foods from one inventory snapshot, indexed by id, name, category and barcode."""
+
+    def __init__(self, foods, stamp=None):
+        self.foods = foods
+        self.stamp = stamp
+        self.by_id = {}
+        self.by_name = {}
+        self.by_category = {}
+        self.by_barcode = {}
+
+        for food in foods:
+            self.by_id.setdefault(food["id"], food)
+            self.by_name.setdefault(food["name"].lower(), food)
+            self.by_category.setdefault(str(food["category"]).lower(), []).append(food)
+            if food["barcode"]:
+                self.by_barcode.setdefault(food["barcode"], food)
+
+    def get(self, food_id):
+        return self.by_id.get(food_id)
+
+    def find_by_name(self, name):
+        return self.by_name.get(name.lower())
+
+    def in_category(self, category):
+        return self.by_category.get(category.lower(), [])
+
+    def find_by_barcode(self, barcode):
+        return self.by_barcode.get(barcode)
+
+
+def build_catalog(inventory, stamp=None):
+    # Items keep their inventory id, so a delete never renumbers other foods
+    foods = [
+        _food_from_item(item, position)
+        for position, item in enumerate(inventory.get("items", []), start=1)
+    ]
+    return FoodCatalog(foods, stamp)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_food_catalog():
+    """Return the shared FoodCatalog, rebuilt only when the inventory changes."""
+    global _catalog
+
+    stamp = inventory_stamp()
+    with _catalog_lock:
+        if _catalog is None or _catalog.stamp != stamp:
+            _catalog = build_catalog(load_inventory(), stamp)
+        return _catalog
+
+
+def load_foods(path=None):
     """
-    Load foods from sample_food.json
+    Load foods from the inventory (or a given inventory JSON file).
     Returns a simplified list of foods usable by meal generator.
     """
+    if path is None:
+        return get_food_catalog().foods
+
     with open(path, "r", encoding="utf-8") as f:
-        inventory = json.load(f)
-
-    foods = []
-    food_id = 1
-
-    for item in inventory.get("items", []):
-        product = item["product"]
-
-        foods.append({
-            "id": food_id,
-            "name": product["name"],
-            "calories": product["calories"],
-            "protein": product.get("protein", 0),
-            "cholesterol": product.get("cholesterol", 0),
-            "sugar": product.get("sugar", 0),
-            "sodium": product.get("sodium", 0),
-            "category": product["category"],
-            "allergens": product.get("allergens", [])
-        })
-        food_id += 1
-
-    return foods
+        return build_catalog(json.load(f)).foods
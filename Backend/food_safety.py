@@ -1,68 +1,140 @@
 import json
 import os
+import threading
+from Backend.user_loader import load_user_data, find_user
 
 # ----- Load data ----- #
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 
+CONFLICTS_FILE = os.path.join(DATA_DIR, "med_food_conflicts.json")
+DEFAULT_USER_ID = 1
+
+_conflicts = {"stamp": None, "data": {}}
+_avoid_tables = {}
+_cache_lock = threading.Lock()
+
+
 def load_users():
-    with open(os.path.join(DATA_DIR, "sample_user.json"), "r") as file:
-        return json.load(file)
+    return load_user_data(os.path.join(DATA_DIR, "sample_user.json"))
 
 def load_med_conflicts():
-    with open(os.path.join(DATA_DIR, "med_food_conflicts.json"), "r") as file:
-        return json.load(file)
+    """Parsed med_food_conflicts.json, re-read only when the file changes."""
+    st = os.stat(CONFLICTS_FILE)
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    with _cache_lock:
+        if _conflicts["stamp"] == stamp:
+            return _conflicts["data"]
+
+    with open(CONFLICTS_FILE, "r") as file:
+        data = json.load(file)
+
+    with _cache_lock:
+        _conflicts["stamp"] = stamp
+        _conflicts["data"] = data
+        _avoid_tables.clear()
+    return data
+
+# ----- Compiled avoid table ----- #
+# One dict per user mapping a lowercased food name to the conflicts it
+# triggers, so checking a food is a single hash lookup. Each conflict is
+# (kind, source, severity, reason) where kind is "medication" or "allergy".
+# Tables are cached per user until their medications/allergies change.
+
+def _profile_version(user):
+    return (
+        tuple(user.get("medications", [])),
+        tuple(user.get("allergies", []))
+    )
+
+def compile_avoid_table(user, med_conflicts):
+    table = {}
+
+    for med in user.get("medications", []):
+        if med not in med_conflicts:
+            continue
+        med_data = med_conflicts[med]
+        reason = med_data.get("reason", "No reason provided.")
+        severity = med_data.get("severity", "unknown")
+        for food in med_data.get("avoid", []):
+            table.setdefault(food.lower(), []).append(("medication", med, severity, reason))
+
+    for allergy in user.get("allergies", []):
+        table.setdefault(allergy.lower(), []).append(("allergy", allergy, "allergy", None))
+
+    return table
+
+def get_avoid_table(user):
+    med_conflicts = load_med_conflicts()
+    key = (user.get("role", "elderly"), user.get("id"))
+    version = _profile_version(user)
+
+    with _cache_lock:
+        cached = _avoid_tables.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+    table = compile_avoid_table(user, med_conflicts)
+    with _cache_lock:
+        _avoid_tables[key] = (version, table)
+    return table
+
+def _default_user():
+    return find_user("elderly", DEFAULT_USER_ID, load_users()) or {}
+
+# ----- Batch checks ----- #
+
+def check_foods(food_names, user=None):
+    """
+    Check many food names in one call. Returns {food_name: [conflicts]} for
+    the unsafe ones only; safe foods are left out.
+    """
+    table = get_avoid_table(user if user is not None else _default_user())
+    if not table:
+        return {}
+
+    results = {}
+    for food in food_names:
+        hits = table.get(food.lower())
+        if hits:
+            results[food] = hits
+    return results
+
+def get_unsafe_foods(food_names, user=None):
+    """Lowercased names of the foods that conflict with the user's profile."""
+    return sorted({food.lower() for food in check_foods(food_names, user)})
 
 # ----- Main Safety Check Function ----- #
 # Returns a warning if any conflicts are found and list of those conflicting foods.
-def check_food_safety(user_foods):
-    users_data = load_users()
-    med_conflicts = load_med_conflicts()
-
-    elderly_users = users_data["elderly_users"]
-    user = next(user for user in elderly_users if user["id"] == 1)
-
-    user_meds = user.get("medications", [])
-    user_allergies = user.get("allergies", [])
-
-    warnings = []
-    unsafe_foods = set() 
-
-    # ----- Medication Checks ----- #
-    for med in user_meds:
-        if med in med_conflicts:
-            med_data = med_conflicts[med]
-            avoid_list = med_data.get("avoid", [])
-            reason = med_data.get("reason", "No reason provided.")
-            severity = med_data.get("severity", "unknown")
-
-            for food in user_foods:
-                if food.lower() in avoid_list:
-                    unsafe_foods.add(food.lower())
-
-                    message = (
-                        f"⚠️ WARNING ({severity.upper()}): "
-                        f"{food.title()} should be avoided while taking {med}.\n"
-                        f"Reason: {reason}.\n"
-                        f"Please consult your doctor or pharmacist before making dietary changes."
-                    )
-
-                    warnings.append(message)
-
-    # ----- Allergy Checks ----- #
-    for food in user_foods:
-        if food.lower() in user_allergies:
-            unsafe_foods.add(food.lower())
-
-            message = (
-                f"🚨 ALLERGY ALERT: {food.title()} is listed as an allergy.\n"
-                f"This food should be avoided completely."
-            )
-
-            warnings.append(message)
-
-    return warnings, list(unsafe_foods)
+def check_food_safety(user_foods, user=None):
+    conflicts = check_foods(user_foods, user)
+
+    med_warnings = []
+    allergy_warnings = []
+    unsafe_foods = set()
+
+    for food, hits in conflicts.items():
+        unsafe_foods.add(food.lower())
+
+        for kind, source, severity, reason in hits:
+            if kind == "medication":
+                message = (
+                    f"⚠️ WARNING ({severity.upper()}): "
+                    f"{food.title()} should be avoided while taking {source}.\n"
+                    f"Reason: {reason}.\n"
+                    f"Please consult your doctor or pharmacist before making dietary changes."
+                )
+                med_warnings.append(message)
+            else:
+                message = (
+                    f"🚨 ALLERGY ALERT: {food.title()} is listed as an allergy.\n"
+                    f"This food should be avoided completely."
+                )
+                allergy_warnings.append(message)
+
+    return med_warnings + allergy_warnings, list(unsafe_foods)
 
 # ----- Terminal Test ----- #
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+from Backend.food_loader import get_food_catalog
+from Backend.recipe import recipe_prompt_inputs, load_user, SKILL_MAX_STEPS
+
+# ----- Local recipe generator ----- #
+# A deterministic, template-based recipe built from the same safe, in-stock,
+# ranked ingredient list the LLM prompt uses. It takes a few milliseconds and
+# returns the prompt's JSON schema, so it can stand in whenever the model is
+# slow or unavailable (and in tests).
+
+# Which part of the dish a food plays, by keyword in its name or category
+ROLE_KEYWORDS = [
+    ("protein", ["protein", "meat", "chicken", "tofu", "egg", "fish", "pepperoni", "bean"]),
+    ("grain", ["grain", "rice", "oat", "bread", "pasta", "toast", "noodle"]),
+    ("vegetable", ["vegetable", "broccoli", "carrot", "asparagus", "spinach", "tomato"]),
+    ("fruit", ["fruit", "berr", "apple", "banana", "orange"]),
+    ("dairy", ["dairy", "chees", "milk", "yogurt"])
+]
+
+ROLE_AMOUNTS = {
+    "protein": ("4", "oz"),
+    "grain": ("1", "cup"),
+    "vegetable": ("1", "cup"),
+    "fruit": ("1", "piece"),
+    "dairy": ("1/4", "cup"),
+    "other": ("2", "tbsp")
+}
+
+DISH_NAMES = {
+    "breakfast": "Breakfast Bowl",
+    "lunch": "Lunch Plate",
+    "dinner": "Skillet",
+    "snack": "Snack Plate"
+}
+
+CUISINE_SEASONING = {
+    "italian": "Season with basil, oregano and a little olive oil.",
+    "mexican": "Season with cumin, a pinch of chili powder and lime juice.",
+    "chinese": "Season with a little low-sodium soy sauce and ginger.",
+    "japanese": "Season with a little low-sodium soy sauce and sesame.",
+    "indian": "Season with turmeric, cumin and a pinch of garam masala.",
+    "mediterranean": "Season with lemon juice, oregano and olive oil.",
+    "american": "Season with black pepper and a pinch of garlic powder."
+}
+
+MAX_INGREDIENTS = {1: 3, 2: 3, 3: 4, 4: 5, 5: 6}
+
+
+def food_role(food):
+    text = f"{food.get('name', '')} {food.get('category', '')}".lower()
+    for role, keywords in ROLE_KEYWORDS:
+        if any(k in text for k in keywords):
+            return role
+    return "other"
+
+
+def _cooking_steps(role, name, meal_type):
+    name = name.lower()
+    if role == "protein":
+        return [f"Cook the {name} in a pan over medium heat until cooked through."]
+    if role == "grain":
+        if "bread" in name or "toast" in name:
+            return [f"Toast the {name}."]
+        return [f"Cook the {name} according to the package directions."]
+    if role == "vegetable":
+        return [f"Wash and cut the {name} into bite-sized pieces.",
+                f"Steam or saute the {name} until tender."]
+    if role == "fruit":
+        return [f"Wash and slice the {name}."]
+    return [f"Add the {name}."]
+
+
+def generate_local_recipe(meal_type="dinner", user=None, inputs=None):
+    """A recipe dict in the LLM schema, or None if there is nothing safe to cook with."""
+    user = user or load_user()
+    inputs = inputs or recipe_prompt_inputs(meal_type, user)
+    skill = user.get("cooking_skill", 1)
+
+    catalog = get_food_catalog()
+    chosen = []
+    seen_roles = set()
+    limit = MAX_INGREDIENTS.get(skill, 3)
+
+    # Best-ranked food of each role first, then fill up with the rest in rank order
+    foods = [catalog.find_by_name(name) or {"name": name} for name in inputs["ingredients"]]
+    for food in foods:
+        role = food_role(food)
+        if role not in seen_roles:
+            seen_roles.add(role)
+            chosen.append((role, food))
+    for food in foods:
+        if len(chosen) >= limit:
+            break
+        if all(food is not f for _, f in chosen):
+            chosen.append((food_role(food), food))
+    chosen = chosen[:limit]
+
+    if not chosen:
+        return None
+
+    steps = []
+    for role, food in chosen:
+        steps += _cooking_steps(role, food["name"], meal_type)
+
+    cuisines = [c.lower() for c in inputs.get("preferred_cuisines", [])]
+    cuisine = next((c for c in cuisines if c in CUISINE_SEASONING), None)
+    if cuisine:
+        steps.append(CUISINE_SEASONING[cuisine])
+    steps.append("Combine everything on a plate and serve.")
+
+    max_steps = SKILL_MAX_STEPS.get(skill, SKILL_MAX_STEPS[1])
+    if len(steps) > max_steps:
+        steps = steps[:max_steps - 1] + [steps[-1]]
+
+    main = chosen[0][1]["name"].title()
+    prefix = f"{cuisine.title()} " if cuisine else ""
+
+    return {
+        "recipe_name": f"{prefix}{main} {DISH_NAMES.get(meal_type, 'Plate')}",
+        "servings": 1,
+        "ingredients": [
+            {"amount": ROLE_AMOUNTS[role][0], "unit": ROLE_AMOUNTS[role][1], "name": food["name"].lower()}
+            for role, food in chosen
+        ],
+        "steps": steps,
+        "estimated_time_minutes": 5 * len(steps)
+    }
@@ -0,0 +1,122 @@
+# Backend/persistence.py
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ----- Safe JSON persistence ----- #
+# Shared by everything that rewrites a file under data/:
+#   - atomic_write_json(): write a temp file in the same directory, fsync it
+#     and os.replace() it over the target, so readers see either the old or
+#     the new file, never a truncated one.
+#   - file_lock(): an advisory lock on "<file>.lock" (fcntl.flock, or msvcrt
+#     on Windows) held only around read-modify-write sections, so several
+#     worker processes can share the files. try_file_lock() is the
+#     non-blocking form, for work only one process should do.
+#   - file_stamp() / VersionConflict: optimistic checks; a writer remembers
+#     the stamp it read and refuses to overwrite a file that changed since.
+
+
+class VersionConflict(Exception):
+    """The file changed on disk since the caller read it."""
+
+
+def file_stamp(path):
+    """(mtime_ns, size, inode) of path, or None if it doesn't exist. Changes on every atomic write."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _new_file_mode():
+    # What open() would give a new file under this process's umask
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+_NEW_FILE_MODE = _new_file_mode()
+
+
+def atomic_write_text(path, text):
+    """Replace path with text, atomically and durably, keeping the file's permissions."""
+    path = os.fspath(path)
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = _NEW_FILE_MODE
+
+    # mkstemp always creates 0600 files, so set the mode before swapping in
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    # Make the rename itself durable (not possible / needed on Windows)
+    if fcntl is not None:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def atomic_write_json(path, obj, indent=None):
+    """Replace path with obj serialized as JSON, atomically and durably."""
+    atomic_write_text(path, json.dumps(obj, indent=indent))
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Advisory inter-process lock for path (shared locks are exclusive on Windows)."""
+    lock_path = os.fspath(path) + ".lock"
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def try_file_lock(path):
+    """
+    Take the exclusive lock for path without waiting. Returns the open lock
+    file (keep it; closing it releases the lock), or None if another process
+    holds it.
+    """
+    f = open(os.fspath(path) + ".lock", "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
@@ -0,0 +1,188 @@
+# Backend/product_db.py
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+# ----- Offline product database ----- #
+# A local copy of Open Food Facts, keyed by barcode, so scanning works without
+# network access. Built by streaming an OFF export (CSV/TSV or JSONL,
+# optionally gzipped) into SQLite; only barcodes with a valid EAN/UPC check
+# digit are indexed.
+#
+#   python -m Backend.product_db import <export file>
+
+PRODUCT_DB_FILE = "data/products.db"
+IMPORT_BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    barcode TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    brand TEXT,
+    category TEXT,
+    calories REAL
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+
+
+# ----- Barcodes ----- #
+
+def normalize_barcode(barcode):
+    """Digits only; 12-digit UPC-A codes become their 13-digit EAN form."""
+    digits = "".join(ch for ch in str(barcode or "") if ch.isdigit())
+    if len(digits) == 12:
+        digits = "0" + digits
+    return digits
+
+
+def has_valid_check_digit(code):
+    """GTIN check digit (EAN-8, UPC-A, EAN-13, GTIN-14) for a digits-only code."""
+    if len(code) not in (8, 12, 13, 14) or not code.isdigit():
+        return False
+
+    body, check = code[:-1], int(code[-1])
+    # Weights alternate 3, 1, 3, ... starting from the digit next to the check digit
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return (10 - total % 10) % 10 == check
+
+
+# ----- Connection ----- #
+
+def get_connection(path=PRODUCT_DB_FILE, create=False):
+    """This thread's connection, or None if the database doesn't exist (and create is False)."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(path)
+    if conn is None:
+        if not create and not os.path.exists(path):
+            return None
+        conn = sqlite3.connect(path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conn
+
+
+def find_product(barcode, path=PRODUCT_DB_FILE):
+    """Product dict in lookup_product's shape, or None if it's not in the local database."""
+    conn = get_connection(path)
+    if conn is None:
+        return None
+
+    row = conn.execute(
+        "SELECT name, brand, category, calories FROM products WHERE barcode = ?",
+        (normalize_barcode(barcode),)
+    ).fetchone()
+    if row is None:
+        return None
+
+    name, brand, category, calories = row
+    return {"name": name, "brand": brand, "category": category, "calories": calories}
+
+
+# ----- Import ----- #
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _calories(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _iter_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            p = json.loads(line)
+        except ValueError:
+            continue
+        yield (
+            p.get("code"),
+            p.get("product_name"),
+            p.get("brands"),
+            p.get("categories"),
+            (p.get("nutriments") or {}).get("energy-kcal_100g")
+        )
+
+
+def _iter_csv(f):
+    # OFF's "CSV" export is tab-separated; plain comma CSVs work too
+    sample = f.readline()
+    delimiter = "\t" if "\t" in sample else ","
+    fields = next(csv.reader([sample], delimiter=delimiter))
+    for row in csv.DictReader(f, fieldnames=fields, delimiter=delimiter):
+        yield (
+            row.get("code"),
+            row.get("product_name"),
+            row.get("brands"),
+            row.get("categories"),
+            row.get("energy-kcal_100g")
+        )
+
+
+def iter_export(path):
+    """Stream (barcode, name, brand, category, calories) rows from an OFF export."""
+    csv.field_size_limit(sys.maxsize)
+    jsonl = any(path.endswith(ext) for ext in (".jsonl", ".jsonl.gz", ".json", ".json.gz"))
+    with _open_text(path) as f:
+        yield from (_iter_jsonl(f) if jsonl else _iter_csv(f))
+
+
+def import_products(source, path=PRODUCT_DB_FILE, batch_size=IMPORT_BATCH_SIZE):
+    """Import an OFF export into the product database; returns import counts."""
+    conn = get_connection(path, create=True)
+    stats = {"imported": 0, "invalid_barcode": 0, "no_name": 0}
+    batch = []
+
+    def flush():
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO products (barcode, name, brand, category, calories) "
+                "VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+        batch.clear()
+
+    for code, name, brand, category, calories in iter_export(source):
+        code = normalize_barcode(code)
+        if not has_valid_check_digit(code):
+            stats["invalid_barcode"] += 1
+            continue
+        if not name:
+            stats["no_name"] += 1
+            continue
+
+        batch.append((code, name, brand or "Unknown", category or "Unknown", _calories(calories)))
+        stats["imported"] += 1
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    print(f"Imported {stats['imported']} products into {path} "
+          f"({stats['invalid_barcode']} invalid barcodes, {stats['no_name']} without a name)")
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        import_products(sys.argv[2])
+    else:
+        print("Usage: python -m Backend.product_db import <openfoodfacts export (.csv/.tsv/.jsonl[.gz])>")
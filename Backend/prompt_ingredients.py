@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+from Backend.food_filter import get_safe_foods
+from Backend.food_loader import get_food_catalog
+from Backend.food_safety import get_unsafe_foods
+
+# ----- Prompt ingredient selection ----- #
+# Instead of sending the whole inventory, the recipe prompt gets only foods
+# that are safe for the user (allergies, diet, medications), in stock and not
+# expired, ranked by how well they fit the meal type and preferred cuisines
+# and capped at PROMPT_INGREDIENT_LIMIT.
+
+PROMPT_INGREDIENT_LIMIT = 20
+EXPIRING_SOON_DAYS = 3
+
+# Keywords matched against a food's lowercased name and category
+MEAL_TYPE_KEYWORDS = {
+    "breakfast": ["fruit", "berr", "banana", "apple", "egg", "oat", "bread", "toast", "milk", "dairy", "chees", "yogurt"],
+    "lunch": ["bread", "vegetable", "protein", "chicken", "tofu", "chees", "rice", "hummus", "sauce", "meat"],
+    "dinner": ["protein", "meat", "chicken", "tofu", "vegetable", "broccoli", "carrot", "asparagus", "rice", "grain", "pasta", "sauce"],
+    "snack": ["fruit", "berr", "snack", "dip", "hummus", "chees", "carrot"]
+}
+
+CUISINE_KEYWORDS = {
+    "american": ["chicken", "bread", "chees", "egg", "mayonnaise", "mustard", "pepperoni", "apple"],
+    "italian": ["tomato", "pasta", "basil", "chees", "vodka sauce", "olive", "garlic", "pepperoni"],
+    "mexican": ["bean", "tortilla", "salsa", "rice", "avocado", "chees", "chicken"],
+    "mediterranean": ["hummus", "olive", "chickpea", "feta", "tomato", "yogurt"],
+    "asian": ["rice", "tofu", "soy", "ginger", "noodle", "broccoli"],
+    "chinese": ["rice", "tofu", "soy", "ginger", "noodle", "broccoli"],
+    "japanese": ["rice", "tofu", "soy", "noodle", "fish"],
+    "indian": ["rice", "lentil", "chickpea", "yogurt", "spinach", "potato"]
+}
+
+
+def _matches(text, keywords):
+    return any(k in text for k in keywords)
+
+
+def is_expired(food, today=None):
+    """Foods with no expiration date are treated as shelf-stable."""
+    expires = food.get("expiration_date")
+    if not expires:
+        return False
+    try:
+        return date.fromisoformat(expires) < (today or date.today())
+    except ValueError:
+        return False
+
+
+def relevance_score(food, meal_type, cuisines, today=None):
+    text = f"{food['name']} {food.get('category', '')}".lower()
+    score = 0
+
+    if _matches(text, MEAL_TYPE_KEYWORDS.get(meal_type, [])):
+        score += 2
+    for cuisine in cuisines:
+        if _matches(text, CUISINE_KEYWORDS.get(cuisine.lower(), [])):
+            score += 1
+
+    # Nudge towards foods that should be used up soon
+    expires = food.get("expiration_date")
+    if expires:
+        try:
+            if date.fromisoformat(expires) <= (today or date.today()) + timedelta(days=EXPIRING_SOON_DAYS):
+                score += 1
+        except ValueError:
+            pass
+
+    return score
+
+
+def select_prompt_ingredients(user, meal_type, limit=PROMPT_INGREDIENT_LIMIT, today=None):
+    """Names of the safe, in-stock, unexpired foods most relevant to the meal, best first."""
+    catalog = get_food_catalog()
+    foods = get_safe_foods(user, catalog)
+    unsafe = set(get_unsafe_foods([f["name"] for f in foods], user))
+    cuisines = user.get("preferred_cuisines", [])
+
+    candidates = {}
+    for food in foods:
+        key = food["name"].strip().lower()
+        if key in unsafe or key in candidates:
+            continue
+        if (food.get("quantity") or 0) <= 0 or is_expired(food, today):
+            continue
+        candidates[key] = (relevance_score(food, meal_type, cuisines, today), food["name"].strip())
+
+    ranked = sorted(candidates.values(), key=lambda c: (-c[0], c[1].lower()))
+    return [name for _, name in ranked[:limit]]
+
+
+# ----- Token counting ----- #
+
+def count_tokens(text):
+    """tiktoken's count when it is installed, otherwise ~4 characters per token."""
+    try:
+        import tiktoken
+    except ImportError:
+        return max(1, len(text) // 4)
+    return len(tiktoken.get_encoding("cl100k_base").encode(text))
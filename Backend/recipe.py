@@ -1,7 +1,14 @@
 import json
 import os
-from dotenv import load_dotenv
-from Backend.food_safety import check_food_safety
+import threading
+from types import SimpleNamespace
+from Backend.food_loader import get_food_catalog
+from Backend.food_safety import get_unsafe_foods, get_avoid_table
+from Backend.prompt_ingredients import select_prompt_ingredients, count_tokens
+from Backend.recipe_cache import cache_key, get_recipe_cache
+from Backend.recipe_stream import RecipeStreamParser
+from Backend.storage import load_inventory
+from Backend.user_loader import load_user_data, find_user
 
 # ----- Load sample food and user data ----- #
 
@@ -9,33 +16,23 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 
 def load_food():
-    with open(os.path.join(DATA_DIR, "sample_food.json"), "r") as file:
-        return json.load(file)
+    return load_inventory()
 #Load a single elderly user's data from sample_user.json. Defaults to user_id=1  
 def load_user(user_id=1):
-    with open(os.path.join(DATA_DIR, "sample_user.json"), "r") as file:
-        data = json.load(file)
+    data = load_user_data(os.path.join(DATA_DIR, "sample_user.json"))
     
-    elderly_users = data.get("elderly_users", [])
     # Find the user with the specified ID
-    user = next((u for u in elderly_users if u["id"] == user_id), {})
-    
-    return user
+    return find_user("elderly", user_id, data) or {}
 
 #Get list of foods to not include in recipes
-def get_restricted_foods():
+def get_restricted_foods(user=None):
     # Load the JSON with all items
     data = load_food()
     # Extract just the food names
     food_names = [item["product"]["name"] for item in data.get("items", [])]
     
-    # Run your existing check_food_safety function
-    _, unsafe_foods = check_food_safety(food_names)
-    
-    return unsafe_foods
-
-restricted = get_restricted_foods()
-print("Foods to avoid:", restricted)
+    # One batch lookup against the user's compiled avoid table
+    return get_unsafe_foods(food_names, user)
 
 #Get available household ingredients
 def get_available_ingredients():
@@ -45,89 +42,239 @@ def get_available_ingredients():
 
 # ----- AI Recipe Generation ----- #
 
-#Recipe prompt for OpenAI
-def build_recipe_prompt(meal_type="dinner"):
+# Skill level instructions
+SKILL_RULES = {
+    1: "Very beginner: Use simple cooking techniques. Maximum 6 steps.",
+    2: "Beginner: Keep the recipe simple. Maximum 6 steps.",
+    3: "Intermediate: Moderate complexity allowed. Maximum 8 steps.",
+    4: "Advanced: Normal recipe complexity allowed.",
+    5: "Expert: Normal recipe complexity allowed."
+}
 
-    user = load_user()
-    ingredients = get_available_ingredients()
-    restricted = get_restricted_foods()
+SKILL_MAX_STEPS = {1: 6, 2: 6, 3: 8, 4: 10, 5: 12}
 
-    dietary_restrictions = user.get("dietary_restrictions", [])
-    preferred_cuisines = user.get("preferred_cuisines", [])
+#Everything the prompt depends on; also the recipe cache key
+def recipe_prompt_inputs(meal_type="dinner", user=None):
+    user = user or load_user()
     cooking_skill = user.get("cooking_skill", 1)
 
-    # Skill level instructions
-    skill_rules = {
-        1: "Very beginner: Use simple cooking techniques. Maximum 6 steps.",
-        2: "Beginner: Keep the recipe simple. Maximum 6 steps.",
-        3: "Intermediate: Moderate complexity allowed. Maximum 8 steps.",
-        4: "Advanced: Normal recipe complexity allowed.",
-        5: "Expert: Normal recipe complexity allowed."
+    return {
+        "meal_type": meal_type,
+        "ingredients": select_prompt_ingredients(user, meal_type),
+        "avoid": sorted(get_avoid_table(user)),
+        "dietary_restrictions": user.get("dietary_restrictions", []),
+        "preferred_cuisines": user.get("preferred_cuisines", []),
+        "skill_instruction": SKILL_RULES.get(cooking_skill, SKILL_RULES[1])
     }
 
-    skill_instruction = skill_rules.get(cooking_skill, skill_rules[1])
+#Prompt size instrumentation: hooks get a dict of token counts per prompt
+#(nothing is measured while no hook is registered)
+_prompt_hooks = []
+_inventory_tokens = (None, 0)  # (catalog, token count of all its names)
 
-    prompt = f"""
-        You are a recipe generator.
+def register_prompt_hook(hook):
+    _prompt_hooks.append(hook)
 
-        Generate a recipe using ONLY the provided ingredients.
+#Size of the whole inventory, counted once per catalog (i.e. per inventory change)
+def _full_inventory_size():
+    global _inventory_tokens
 
-        Available ingredients:
-        {ingredients}
+    catalog = get_food_catalog()
+    counted, tokens = _inventory_tokens
+    if counted is not catalog:
+        tokens = count_tokens(str([food["name"] for food in catalog.foods]))
+        _inventory_tokens = (catalog, tokens)
+    return len(catalog.foods), tokens
 
-        Constraints:
-        - Avoid restricted foods: {restricted}
-        - Consider dietary restrictions: {dietary_restrictions}
-        - Consider preferred cuisines: {preferred_cuisines}
-        - Meal type: {meal_type}
-        - Skill level: {skill_instruction}
+def _report_prompt_size(prompt, inputs):
+    if not _prompt_hooks:
+        return
 
-        Ingredient Rules:
-        - Ingredient names must be simple food names (e.g., "chicken breast", "white rice", "broccoli").
-        - Do NOT include preparation words like "chopped" or "diced".
+    inventory_size, inventory_tokens = _full_inventory_size()
+    stats = {
+        "meal_type": inputs["meal_type"],
+        "prompt_tokens": count_tokens(prompt),
+        "ingredients_sent": len(inputs["ingredients"]),
+        "inventory_size": inventory_size,
+        "ingredient_tokens": count_tokens(", ".join(inputs["ingredients"])),
+        "full_inventory_tokens": inventory_tokens
+    }
+    for hook in _prompt_hooks:
+        hook(stats)
 
-        Return ONLY valid JSON in this format:
+#Recipe prompt for OpenAI (comma-separated lists, no indentation, one-line schema)
+def build_recipe_prompt(meal_type="dinner", user=None, inputs=None):
+    inputs = inputs or recipe_prompt_inputs(meal_type, user)
 
-        {{
-        "recipe_name": "",
-        "servings": 1,
-        "ingredients": [
-            {{ "amount": "", "unit": "", "name": "" }}
-        ],
-        "steps": [],
-        "estimated_time_minutes": 0
-        }}
-        """
+    def csv(items):
+        return ", ".join(items) or "none"
+
+    prompt = (
+        "Generate a recipe using ONLY these ingredients (most relevant first):\n"
+        f"{csv(inputs['ingredients'])}\n"
+        f"Never use: {csv(inputs['avoid'])}\n"
+        f"Diet: {csv(inputs['dietary_restrictions'])}. "
+        f"Cuisines: {csv(inputs['preferred_cuisines'])}. "
+        f"Meal: {inputs['meal_type']}. Skill: {inputs['skill_instruction']}\n"
+        "Ingredient names must be simple food names (e.g. \"chicken breast\"), no preparation words.\n"
+        "Return ONLY JSON: "
+        '{"recipe_name":"","servings":1,"ingredients":[{"amount":"","unit":"","name":""}],'
+        '"steps":[],"estimated_time_minutes":0}'
+    )
+
+    _report_prompt_size(prompt, inputs)
     return prompt
 
+#Strip ```json fences from a model response and parse it
+def parse_recipe_response(raw):
+    raw = (raw or "").strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`")              # remove backticks
+        raw = raw.replace("json\n", "", 1)  # remove 'json\n'
+    return json.loads(raw)
+
+def _is_valid_recipe(raw):
+    try:
+        return isinstance(parse_recipe_response(raw), dict)
+    except ValueError:
+        return False
+
 #Calling OpenAi to generate recipe
-from openai import AzureOpenAI
-load_dotenv()  # Load environment variables from .env file
-endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-key = os.getenv("AZURE_OPENAI_KEY1")
-
-client = AzureOpenAI(
-    api_version="2024-12-01-preview",
-    azure_endpoint = endpoint,
-    api_key = key,
-)
-
-def generate_recipe(meal_type="dinner"):
-    # 1️⃣ Build the prompt
-    prompt = build_recipe_prompt(meal_type)
-
-    # 2️⃣ Call Azure OpenAI
-    response = client.chat.completions.create(
+# The client (and the openai package / .env it needs) is created on first use,
+# so importing this module at blueprint registration does no I/O.
+# RECIPE_CLIENT=fake (or set_client()) swaps in a local client for tests.
+_client = None
+_client_lock = threading.Lock()
+
+class FakeClient:
+    """Offline stand-in for AzureOpenAI that returns a fixed recipe."""
+
+    RECIPE = {
+        "recipe_name": "Simple Test Recipe",
+        "servings": 1,
+        "ingredients": [{"amount": "1", "unit": "cup", "name": "white rice"}],
+        "steps": ["Cook the rice.", "Serve warm."],
+        "estimated_time_minutes": 20
+    }
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, stream=False, **kwargs):
+        self.calls += 1
+        content = json.dumps(self.RECIPE, indent=2)
+        if stream:
+            return self._stream(content)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self, content, size=8):
+        # Chunks shaped like the streaming API's: choices[0].delta.content
+        for i in range(0, len(content), size):
+            delta = SimpleNamespace(content=content[i:i + size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+def set_client(client):
+    global _client
+
+    with _client_lock:
+        _client = client
+
+def get_client():
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            if os.getenv("RECIPE_CLIENT") == "fake":
+                _client = FakeClient()
+                return _client
+
+            from dotenv import load_dotenv
+            from openai import AzureOpenAI
+
+            load_dotenv()  # Load environment variables from .env file
+            _client = AzureOpenAI(
+                api_version="2024-12-01-preview",
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                api_key=os.getenv("AZURE_OPENAI_KEY1"),
+            )
+        return _client
+
+def call_model(prompt, stream=False):
+    response = get_client().chat.completions.create(
         model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),  # deployment name from .env
         messages=[
             {"role": "system", "content": "You generate structured cooking recipes."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.4
+        temperature=0.4,
+        stream=stream
+    )
+    if stream:
+        return response
+    return response.choices[0].message.content
+
+def _stream_text(response):
+    for chunk in response:
+        # Azure sends some chunks (e.g. content filter results) with no choices
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def generate_recipe(meal_type="dinner", user=None):
+    # 1️⃣ Collect the prompt inputs; their hash is the cache key
+    inputs = recipe_prompt_inputs(meal_type, user)
+    key = cache_key(inputs)
+
+    # 2️⃣ Call Azure OpenAI only on a cache miss (identical concurrent
+    #    requests share one call); unparseable responses are not cached
+    cache = get_recipe_cache()
+    raw = cache.get_or_generate(
+        key,
+        lambda: call_model(build_recipe_prompt(inputs=inputs)),
+        should_cache=_is_valid_recipe
     )
 
     # 3️⃣ RETURN the AI response (important!)
-    return response.choices[0].message.content
+    return raw
+
+#The (event, value) stream for a recipe that is already complete
+def recipe_events(recipe):
+    yield "recipe_name", recipe.get("recipe_name", "")
+    for ingredient in recipe.get("ingredients", []):
+        yield "ingredient", ingredient
+    for step in recipe.get("steps", []):
+        yield "step", step
+    yield "done", recipe
+
+#Streaming version of generate_recipe: yields (event, value) pairs as parts
+#of the recipe become available - "recipe_name", "ingredient" and "step",
+#then "done" with the full recipe (or "error"). Cached recipes replay at once.
+def stream_recipe(meal_type="dinner", user=None):
+    inputs = recipe_prompt_inputs(meal_type, user)
+    key = cache_key(inputs)
+    cache = get_recipe_cache()
+
+    cached = cache.peek(key)
+    if cached is not None:
+        yield from recipe_events(parse_recipe_response(cached))
+        return
+
+    parser = RecipeStreamParser()
+    try:
+        for text in _stream_text(call_model(build_recipe_prompt(inputs=inputs), stream=True)):
+            for event in parser.feed(text):
+                yield event
+
+        recipe = parse_recipe_response(parser.buf)
+    except Exception as e:
+        print("AI STREAM ERROR:", e)
+        yield "error", "Recipe generation failed"
+        return
+
+    cache.put(key, parser.buf)
+    yield "done", recipe
 
 #save recipe function to saved recipe files (if user liked, will ask after meal)
 
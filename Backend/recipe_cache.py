@@ -0,0 +1,187 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from Backend.persistence import atomic_write_json, file_lock, file_stamp
+
+# ----- Content-addressed recipe cache ----- #
+# Generated recipes keyed by a hash of the prompt inputs (restrictions,
+# inventory, meal type, skill...), so an unchanged request never goes back to
+# the LLM. Entries expire after a TTL, the least recently used are evicted past
+# a size cap, and the whole cache is persisted to a JSON file. Concurrent
+# requests for the same key share one generation (singleflight).
+#
+# Several processes (web workers, the pre-generation scheduler) share the
+# file: it is re-read whenever its stamp changes, and writes merge into the
+# current file under its lock instead of overwriting it.
+
+RECIPE_CACHE_FILE = "data/recipe_cache.json"
+RECIPE_CACHE_TTL = 24 * 60 * 60
+RECIPE_CACHE_MAX = 200
+
+
+def cache_key(inputs):
+    """Stable sha256 of the prompt inputs."""
+    blob = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class RecipeCache:
+    def __init__(self, path=RECIPE_CACHE_FILE, ttl=RECIPE_CACHE_TTL, max_entries=RECIPE_CACHE_MAX):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = None
+        self._stamp = None
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0}
+
+    # ----- Storage ----- #
+
+    def _load(self):
+        """(Re)read the file if it changed since we last read or wrote it."""
+        stamp = file_stamp(self.path) if self.path else None
+        if self._entries is not None and stamp == self._stamp:
+            return
+
+        self._entries = OrderedDict()
+        self._stamp = stamp
+        if stamp is not None:
+            try:
+                with open(self.path, "r") as f:
+                    for key, entry in json.load(f).items():
+                        self._entries[key] = entry
+            except (OSError, ValueError) as e:
+                print("RECIPE CACHE: ignoring unreadable cache file:", e)
+
+    def _prune(self):
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if now - e["created"] > self.ttl]:
+            del self._entries[key]
+            self._stats["expired"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _persist(self):
+        if not self.path:
+            return
+        atomic_write_json(self.path, self._entries)
+        self._stamp = file_stamp(self.path)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created"] > self.ttl:
+            del self._entries[key]
+            self._stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry["value"]
+
+    def _insert(self, key, value):
+        if not self.path:
+            self._entries[key] = {"created": time.time(), "value": value}
+            self._prune()
+            return
+
+        # Merge into the file as it is now, so other processes' entries survive
+        with file_lock(self.path):
+            self._load()
+            self._entries[key] = {"created": time.time(), "value": value}
+            self._entries.move_to_end(key)
+            self._prune()
+            self._persist()
+
+    # ----- Public API ----- #
+
+    def peek(self, key):
+        """Cached value or None, without generating (or counting a miss)."""
+        with self._lock:
+            self._load()
+            return self._lookup(key)
+
+    def put(self, key, value):
+        with self._lock:
+            self._load()
+            self._insert(key, value)
+
+    def get_or_generate(self, key, generate, should_cache=lambda value: True):
+        """
+        Return the cached value for key, or call generate() once and cache its
+        result. Callers arriving while a generation for the same key is in
+        flight wait for it instead of starting their own.
+        """
+        with self._lock:
+            self._load()
+            value = self._lookup(key)
+            if value is not None:
+                self._stats["hits"] += 1
+                return value
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = generate()
+            if flight.value is not None and should_cache(flight.value):
+                with self._lock:
+                    self._insert(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries or {})
+        requests = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / requests, 3) if requests else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            if self.path:
+                with file_lock(self.path):
+                    self._persist()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_recipe_cache():
+    """The process-wide RecipeCache."""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = RecipeCache()
+        return _cache
@@ -0,0 +1,70 @@
+import json
+import re
+
+# ----- Incremental recipe JSON parsing ----- #
+# Pulls recipe_name, each ingredient and each step out of a partial JSON
+# response as soon as they are complete, so they can be shown while the model
+# is still writing the rest. Only the recipe schema from build_recipe_prompt
+# is understood; the full text is still parsed normally at the end.
+
+_decoder = json.JSONDecoder()
+
+SCALAR_FIELDS = ("recipe_name",)
+ARRAY_FIELDS = {"ingredients": "ingredient", "steps": "step"}
+
+
+def _field_start(buf, field, opener=""):
+    match = re.search(r'"%s"\s*:\s*%s' % (re.escape(field), re.escape(opener)), buf)
+    return match.end() if match else None
+
+
+class RecipeStreamParser:
+    def __init__(self):
+        self.buf = ""
+        self.sent_scalars = set()
+        self.array_pos = {}        # field -> next parse position, or None once closed
+
+    def feed(self, text):
+        """Add a chunk of model output; returns [(event, value), ...] newly complete."""
+        self.buf += text
+        events = []
+
+        for field in SCALAR_FIELDS:
+            if field in self.sent_scalars:
+                continue
+            start = _field_start(self.buf, field)
+            if start is None:
+                continue
+            try:
+                value, _ = _decoder.raw_decode(self.buf, start)
+            except ValueError:
+                continue
+            self.sent_scalars.add(field)
+            events.append((field, value))
+
+        for field, event in ARRAY_FIELDS.items():
+            pos = self.array_pos.get(field, 0)
+            if pos is None:
+                continue
+            if pos == 0:
+                pos = _field_start(self.buf, field, "[")
+                if pos is None:
+                    continue
+
+            while True:
+                while pos < len(self.buf) and self.buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos >= len(self.buf):
+                    break
+                if self.buf[pos] == "]":
+                    pos = None
+                    break
+                try:
+                    value, pos = _decoder.raw_decode(self.buf, pos)
+                except ValueError:
+                    break
+                events.append((event, value))
+
+            self.array_pos[field] = pos
+
+        return events
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from Backend.persistence import atomic_write_json
+from Backend.food_safety import load_med_conflicts, compile_avoid_table
+from Backend.user_loader import load_user_data
+
+# ----- Facility-wide meal safety audit ----- #
+# Checks every elderly user's logged meals against their medications and
+# allergies. Users are streamed into shards and checked in a process pool;
+# findings are appended to a JSONL report as each shard finishes. A per-user
+# watermark (newest meal timestamp already audited) is kept in a state file so
+# a nightly run only looks at meals logged since the previous one.
+#
+#   python -m Backend.safety_audit [--workers N] [--shard-size N] [--full]
+
+REPORT_FILE = "data/safety_audit.jsonl"
+STATE_FILE = "data/safety_audit_state.json"
+SHARD_SIZE = 50
+
+TIMESTAMP_FORMATS = ("%B %d, %Y at %I:%M:%S %p", "%B %d, %Y at %I:%M %p")
+
+
+def meal_time(meal):
+    """Parsed meal timestamp, falling back to the start of its date."""
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(meal.get("timestamp", ""), fmt)
+        except ValueError:
+            continue
+    if meal.get("date"):
+        return datetime.fromisoformat(meal["date"])
+    return None
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    atomic_write_json(path, state, indent=2)
+
+
+# ----- Sharding ----- #
+
+def iter_new_meals(data, state, full=False):
+    """
+    Yield (user, new_meals, new_watermark) for each elderly user with meals
+    logged after their stored watermark.
+    """
+    for user in data.get("elderly_users", []):
+        watermark = None if full else state.get(str(user["id"]))
+        since = datetime.fromisoformat(watermark) if watermark else None
+
+        new_meals = []
+        newest = since
+        for meal in user.get("meals", []):
+            when = meal_time(meal)
+            if when is None or (since and when <= since):
+                continue
+            new_meals.append(meal)
+            newest = max(newest, when) if newest else when
+
+        if new_meals:
+            profile = {
+                "id": user["id"],
+                "role": user.get("role", "elderly"),
+                "username": user.get("account", {}).get("username"),
+                "medications": user.get("medications", []),
+                "allergies": user.get("allergies", [])
+            }
+            yield profile, new_meals, newest.isoformat()
+
+
+def iter_shards(items, size):
+    shard = []
+    for item in items:
+        shard.append(item)
+        if len(shard) >= size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+# ----- Worker ----- #
+
+_worker_conflicts = {}
+
+
+def _init_worker(med_conflicts):
+    global _worker_conflicts
+    _worker_conflicts = med_conflicts
+
+
+def _meal_foods(meal):
+    """Every food name a meal exposes: its own name plus recipe ingredients."""
+    foods = [meal.get("name", "")]
+    foods += [ing.get("name", "") for ing in meal.get("ingredients", []) if isinstance(ing, dict)]
+    return [f for f in foods if f]
+
+
+def audit_shard(shard, med_conflicts=None):
+    """Check one shard of (user, meals, watermark); returns (findings, watermarks)."""
+    med_conflicts = med_conflicts if med_conflicts is not None else _worker_conflicts
+    findings = []
+    watermarks = {}
+
+    for user, meals, watermark in shard:
+        table = compile_avoid_table(user, med_conflicts)
+        allergies = {a.lower() for a in user["allergies"]}
+
+        for meal in meals:
+            hits = []
+            for food in _meal_foods(meal):
+                for kind, source, severity, reason in table.get(food.lower(), []):
+                    hits.append((food, kind, source, severity, reason))
+            for allergen in meal.get("allergens", []):
+                if allergen.lower() in allergies:
+                    hits.append((allergen, "allergy", allergen, "allergy", None))
+
+            for food, kind, source, severity, reason in hits:
+                findings.append({
+                    "user_id": user["id"],
+                    "username": user["username"],
+                    "meal": meal.get("name"),
+                    "meal_timestamp": meal.get("timestamp"),
+                    "food": food,
+                    "kind": kind,
+                    "source": source,
+                    "severity": severity,
+                    "reason": reason
+                })
+
+        watermarks[str(user["id"])] = watermark
+
+    return findings, watermarks
+
+
+# ----- Runner ----- #
+
+def run_audit(workers=None, shard_size=SHARD_SIZE, full=False,
+              report_path=REPORT_FILE, state_path=STATE_FILE):
+    """Audit new meals, append findings to the report and advance watermarks."""
+    data = load_user_data()
+    med_conflicts = load_med_conflicts()
+    state = load_state(state_path)
+    run_at = datetime.now().isoformat(timespec="seconds")
+
+    shards = iter_shards(iter_new_meals(data, state, full), shard_size)
+    checked_users = 0
+    total = 0
+
+    with open(report_path, "a") as report:
+        def record(result):
+            nonlocal checked_users, total
+            findings, watermarks = result
+            for finding in findings:
+                report.write(json.dumps({"run_at": run_at, **finding}) + "\n")
+            report.flush()
+            state.update(watermarks)
+            checked_users += len(watermarks)
+            total += len(findings)
+
+        if workers == 1:
+            for shard in shards:
+                record(audit_shard(shard, med_conflicts))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(med_conflicts,)) as pool:
+                futures = [pool.submit(audit_shard, shard) for shard in shards]
+                for future in as_completed(futures):
+                    record(future.result())
+
+    save_state(state, state_path)
+    print(f"Audited {checked_users} users, {total} findings -> {report_path}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit logged meals against medications and allergies.")
+    parser.add_argument("--workers", type=int, default=None, help="process count (1 = run in-process)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--full", action="store_true", help="ignore watermarks and re-check every meal")
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--state", default=STATE_FILE)
+    args = parser.parse_args()
+
+    run_audit(args.workers, args.shard_size, args.full, args.report, args.state)
@@ -1,87 +1,271 @@
 # scanner.py
+import argparse
 import json
+import os
+import sys
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from pathlib import Path
+from Backend.storage import INVENTORY_FILE, update_inventory
+from Backend.persistence import atomic_write_json, file_lock
+from Backend.product_db import normalize_barcode, find_product
 
-INVENTORY_FILE = Path("data/sample_food.json") 
+# ----- Open Food Facts lookups ----- #
+# The offline product database (Backend/product_db.py) is checked first. Then
+# one pooled requests.Session (keep-alive) for every lookup, and a persistent
+# cache keyed by normalized barcode. Found products are kept for
+# BARCODE_POSITIVE_TTL, "not found" answers for the shorter
+# BARCODE_NEGATIVE_TTL; network errors are never cached. New answers from a
+# batch of lookups are written once, merged into the file under its lock,
+# and expired entries are dropped on each write. OFF_API_URL points the
+# lookups somewhere else (e.g. a local stub server in tests).
 
-def load_inventory():
-    """Load inventory JSON file, create if it doesn't exist."""
-    if not INVENTORY_FILE.exists():
-        return {"items": []}
-    with open(INVENTORY_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+DEFAULT_OFF_API_URL = "https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
+OFF_TIMEOUT = 5
+LOOKUP_WORKERS = 8
+# Most barcodes one bulk add may look up (each unknown one is a request to Open Food Facts)
+MAX_BULK_BARCODES = 50
 
-def save_inventory(inventory):
-    """Save inventory back to JSON."""
-    with open(INVENTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(inventory, f, indent=2)
+BARCODE_CACHE_FILE = "data/barcode_cache.json"
+BARCODE_POSITIVE_TTL = 30 * 24 * 60 * 60
+BARCODE_NEGATIVE_TTL = 24 * 60 * 60
 
-def lookup_product(barcode):
-    """Query Open Food Facts API for barcode info."""
-    url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
+_session = None
+_barcode_cache = None
+_lock = threading.Lock()
+_cache_lock = threading.Lock()
+_lookup_stats = {"local_hits": 0, "hits": 0, "negative_hits": 0, "misses": 0, "errors": 0}
+
+def get_session():
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def _read_barcode_cache_file():
+    if not os.path.exists(BARCODE_CACHE_FILE):
+        return {}
     try:
-        response = requests.get(url, timeout=5)
-        data = response.json()
-
-        if data.get("status") != 1:
-            return None
-
-        p = data["product"]
-        return {
-            "name": p.get("product_name", "Unknown"),
-            "brand": p.get("brands", "Unknown"),
-            "category": p.get("categories", "Unknown"),
-            "calories": p.get("nutriments", {}).get("energy-kcal_100g", None)
-        }
+        with open(BARCODE_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print("BARCODE CACHE: ignoring unreadable cache file:", e)
+        return {}
+
+def _load_barcode_cache():
+    global _barcode_cache
+
+    if _barcode_cache is None:
+        _barcode_cache = _read_barcode_cache_file()
+    return _barcode_cache
+
+def _expired(entry, now):
+    ttl = BARCODE_POSITIVE_TTL if entry["product"] else BARCODE_NEGATIVE_TTL
+    return now - entry["fetched"] > ttl
+
+def _cached_lookup(code):
+    """(True, product_or_None) for a fresh cache entry, else (False, None)."""
+    with _cache_lock:
+        entry = _load_barcode_cache().get(code)
+    if entry is None or _expired(entry, time.time()):
+        return False, None
+    return True, entry["product"]
+
+def _store_lookups(products):
+    """Cache {code: product_or_None} with a single write of the cache file."""
+    global _barcode_cache
+
+    if not products:
+        return
+
+    now = time.time()
+    with file_lock(BARCODE_CACHE_FILE):
+        # Start from the file so other processes' lookups are kept
+        cache = _read_barcode_cache_file()
+        for code, product in products.items():
+            cache[code] = {"fetched": now, "product": product}
+        cache = {code: entry for code, entry in cache.items() if not _expired(entry, now)}
+        atomic_write_json(BARCODE_CACHE_FILE, cache)
+
+        with _cache_lock:
+            _barcode_cache = cache
+
+def _fetch_product(code):
+    """Product dict, None if Open Food Facts doesn't know it; raises on network errors."""
+    url = os.getenv("OFF_API_URL", DEFAULT_OFF_API_URL).format(barcode=code)
+    response = get_session().get(url, timeout=OFF_TIMEOUT)
+    data = response.json()
+
+    if data.get("status") != 1:
+        return None
+
+    p = data["product"]
+    return {
+        "name": p.get("product_name", "Unknown"),
+        "brand": p.get("brands", "Unknown"),
+        "category": p.get("categories", "Unknown"),
+        "calories": p.get("nutriments", {}).get("energy-kcal_100g", None)
+    }
+
+def _resolve(code):
+    """
+    (product_or_None, fetched) for a normalized barcode; fetched is True when
+    the answer came from Open Food Facts and still has to be cached.
+    """
+    product = find_product(code)
+    if product:
+        _count("local_hits")
+        return product, False
+
+    found, product = _cached_lookup(code)
+    if found:
+        _count("hits" if product else "negative_hits")
+        return product, False
+
+    _count("misses")
+    try:
+        return _fetch_product(code), True
     except Exception as e:
+        _count("errors")
         print("Error connecting to API:", e)
+        return None, False
+
+def lookup_product(barcode):
+    """Query Open Food Facts API for barcode info (cached)."""
+    code = normalize_barcode(barcode)
+    if not code:
         return None
 
+    product, fetched = _resolve(code)
+    if fetched:
+        _store_lookups({code: product})
+    return product
+
+def _count(key):
+    with _lock:
+        _lookup_stats[key] += 1
+
+def get_lookup_stats():
+    with _lock:
+        return dict(_lookup_stats)
+
+def lookup_products(barcodes, workers=LOOKUP_WORKERS):
+    """Look up many barcodes concurrently; returns {barcode: product or None}."""
+    codes = {b: normalize_barcode(b) for b in barcodes if b}
+    unique = list(dict.fromkeys(code for code in codes.values() if code))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(unique) or 1))) as pool:
+        resolved = dict(zip(unique, pool.map(_resolve, unique)))
+
+    # One cache write for the whole batch
+    _store_lookups({code: product for code, (product, fetched) in resolved.items() if fetched})
+    return {b: resolved[code][0] if code else None for b, code in codes.items()}
+
+UNKNOWN_PRODUCT = {
+    "name": "Unknown",
+    "brand": "Unknown",
+    "category": "Unknown",
+    "calories": None
+}
+
+def add_items_to_inventory(entries):
+    """Add many (barcode, product_info) pairs with a single inventory write."""
+    if not entries:
+        return []
+
+    added_at = datetime.now().isoformat()
+
+    def add(inventory):
+        # Ids are assigned under the inventory lock so concurrent batches can't collide
+        next_id = max([item["id"] for item in inventory["items"]] + [0]) + 1
+        new_items = []
+        for offset, (barcode, product_info) in enumerate(entries):
+            new_items.append({
+                "id": next_id + offset,
+                "barcode": barcode,
+                "product": product_info,
+                "quantity": 1,
+                "expiration_date": None,
+                "added_at": added_at
+            })
+        inventory["items"].extend(new_items)
+        return new_items
+
+    new_items = update_inventory(add)
+    for item in new_items:
+        print(f"✅ Added {item['product']['name']} to inventory.")
+    return new_items
+
 def add_item_to_inventory(barcode, product_info):
     """Add a scanned item to inventory JSON."""
-    inventory = load_inventory()
-    new_id = max([item["id"] for item in inventory["items"]] + [0]) + 1
-
-    item = {
-        "id": new_id,
-        "barcode": barcode,
-        "product": product_info,
-        "quantity": 1,
-        "expiration_date": None,
-        "added_at": datetime.now().isoformat()
-    }
+    return add_items_to_inventory([(barcode, product_info)])[0]
 
-    inventory["items"].append(item)
-    save_inventory(inventory)
-    print(f"✅ Added {product_info['name']} to inventory.")
+def ingest_barcodes(barcodes, keep_unknown=False, workers=LOOKUP_WORKERS):
+    """
+    Resolve barcodes concurrently and add them in one write. Unknown barcodes
+    are saved as 'Unknown' products if keep_unknown, otherwise skipped.
+    Returns (added_items, not_found_barcodes).
+    """
+    products = lookup_products(barcodes, workers)
 
-def main():
+    entries = []
+    not_found = []
+    for barcode in barcodes:
+        product = products.get(barcode)
+        if product:
+            entries.append((barcode, product))
+        else:
+            not_found.append(barcode)
+            if keep_unknown:
+                entries.append((barcode, dict(UNKNOWN_PRODUCT)))
+
+    return add_items_to_inventory(entries), not_found
+
+def _scan_session():
+    """Interactive scanning; scans are buffered and saved together."""
     print("📦 Inventory Scanner")
-    print("Scan a barcode or type 'exit' to quit.\n")
+    print("Scan barcodes (press Enter on an empty line to save the batch) or type 'exit' to quit.\n")
 
+    buffered = []
     while True:
         barcode = input("Scan item: ").strip()
-        if barcode.lower() == "exit":
-            break
+        if barcode.lower() == "exit" or not barcode:
+            if buffered:
+                added, not_found = ingest_barcodes(buffered, keep_unknown=True)
+                for code in not_found:
+                    print(f"⚠️ Product not found for {code}. Saved as 'Unknown'.")
+                print(f"Saved {len(added)} items.\n")
+                buffered = []
+            if barcode.lower() == "exit":
+                break
+            continue
 
-        product = lookup_product(barcode)
-        if product:
-            print(f"🔍 Found: {product['name']} ({product['brand']})")
-        else:
-            print("⚠️ Product not found. Saving as 'Unknown'.")
-            product = {
-                "name": "Unknown",
-                "brand": "Unknown",
-                "category": "Unknown",
-                "calories": None
-            }
-
-        add_item_to_inventory(barcode, product)
-        print()
+        buffered.append(barcode)
 
     print(f"All scanned items saved to {INVENTORY_FILE}")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan barcodes into the food inventory.")
+    parser.add_argument("--batch", metavar="FILE", help="add every barcode in FILE ('-' for stdin) in one go")
+    parser.add_argument("--workers", type=int, default=LOOKUP_WORKERS)
+    args = parser.parse_args(argv)
+
+    if not args.batch:
+        _scan_session()
+        return
+
+    f = sys.stdin if args.batch == "-" else open(args.batch, "r")
+    with f:
+        barcodes = [line.strip() for line in f if line.strip()]
+
+    added, not_found = ingest_barcodes(barcodes, keep_unknown=True, workers=args.workers)
+    print(f"Added {len(added)} items ({len(not_found)} not found, saved as 'Unknown') to {INVENTORY_FILE}")
+
 if __name__ == "__main__":
     main()
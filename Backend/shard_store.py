@@ -0,0 +1,207 @@
+# Backend/shard_store.py
+import json
+import os
+import sys
+from Backend.persistence import atomic_write_json, atomic_write_text, file_lock, file_stamp
+
+# ----- Sharded user store ----- #
+# With STORAGE_BACKEND=sharded every user is its own JSON document
+# (data/sample_user_shards/elderly-1.json, ...). index.json lists all users in
+# order with their username and caretaker links; it is only rewritten when a
+# user is added or one of those fields changes. A shard's version is its file
+# stamp, and the one-line "generation" file is bumped on every write, so a
+# reader can tell cheaply whether anything changed. Saving a user or logging a
+# meal writes that user's shard plus the generation; a reload re-parses only
+# the shards whose stamp moved. Run
+#   python -m Backend.shard_store migrate
+# once to split the JSON user file before switching.
+#
+# Files are written atomically, shards before the index and the generation.
+# Writers take the index lock.
+
+USER_LISTS = (("elderly", "elderly_users"), ("caretaker", "caretaker_users"))
+INDEX_FILE = "index.json"
+GENERATION_FILE = "generation"
+
+
+def shard_dir(user_file):
+    """Return the shard directory that belongs to a user file."""
+    return os.path.splitext(user_file)[0] + "_shards"
+
+
+def _index_path(directory):
+    return os.path.join(directory, INDEX_FILE)
+
+
+def _generation_path(directory):
+    return os.path.join(directory, GENERATION_FILE)
+
+
+def _shard_path(directory, key):
+    role, user_id = key
+    return os.path.join(directory, f"{role}-{user_id}.json")
+
+
+def iter_users(data):
+    """Yield ((role, id), user) for every user in a full user document."""
+    for role, list_name in USER_LISTS:
+        for user in data.get(list_name, []):
+            yield (user.get("role") or role, user["id"]), user
+
+
+def generation(directory):
+    """Write counter of the store (0 if it doesn't exist yet)."""
+    try:
+        with open(_generation_path(directory), "r", encoding="utf-8") as f:
+            return int(f.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _bump_generation(directory):
+    atomic_write_text(_generation_path(directory), str(generation(directory) + 1))
+
+
+def read_index(directory):
+    """Return the index, empty if the store doesn't exist yet."""
+    try:
+        with open(_index_path(directory), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"users": []}
+
+
+def read_shard(directory, key):
+    with open(_shard_path(directory, key), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shard_stamp(directory, key):
+    return file_stamp(_shard_path(directory, key))
+
+
+def _index_entry(key, user):
+    role, user_id = key
+    # Older caretaker records link one elderly user, newer ones a list
+    elderly_ids = user.get("elderly_user_ids")
+    if elderly_ids is None:
+        elderly_ids = [user["elderly_user_id"]] if user.get("elderly_user_id") is not None else []
+    return {
+        "role": role,
+        "id": user_id,
+        "username": user.get("account", {}).get("username"),
+        "caretaker_id": user.get("caretaker_id"),
+        "elderly_user_ids": elderly_ids
+    }
+
+
+# ----- Reads ----- #
+
+def load_users(directory, previous=None, previous_stamps=None):
+    """
+    Assemble the full user document from the shards. Users whose shard stamp
+    still matches previous_stamps are reused from previous (an earlier
+    result) instead of being parsed again.
+    Returns (data, {(role, id): stamp}, shards_parsed).
+    """
+    index = read_index(directory)
+    reuse = dict(iter_users(previous)) if previous is not None else {}
+    previous_stamps = previous_stamps or {}
+    list_names = dict(USER_LISTS)
+
+    data = {list_name: [] for _, list_name in USER_LISTS}
+    stamps = {}
+    parsed = 0
+    for entry in index["users"]:
+        key = (entry["role"], entry["id"])
+        stamp = shard_stamp(directory, key)
+        user = reuse.get(key)
+        if user is None or previous_stamps.get(key) != stamp:
+            user = read_shard(directory, key)
+            parsed += 1
+        data[list_names[entry["role"]]].append(user)
+        stamps[key] = stamp
+
+    return data, stamps, parsed
+
+
+# ----- Writes ----- #
+
+def save_users(directory, users, merge=None):
+    """
+    Write each ((role, id), user) in users to its own shard. If merge is
+    given, a user that already has a shard is written as
+    merge(user, user_on_disk). The index is only rewritten for new users or
+    changed usernames / caretaker links.
+    """
+    users = list(users)
+    if not users:
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    with file_lock(_index_path(directory)):
+        index = read_index(directory)
+        positions = {(e["role"], e["id"]): i for i, e in enumerate(index["users"])}
+        index_changed = False
+
+        for key, user in users:
+            pos = positions.get(key)
+            if merge is not None and pos is not None:
+                user = merge(user, read_shard(directory, key))
+            atomic_write_json(_shard_path(directory, key), user, indent=4)
+
+            entry = _index_entry(key, user)
+            if pos is None:
+                positions[key] = len(index["users"])
+                index["users"].append(entry)
+                index_changed = True
+            elif index["users"][pos] != entry:
+                index["users"][pos] = entry
+                index_changed = True
+
+        if index_changed:
+            atomic_write_json(_index_path(directory), index)
+        _bump_generation(directory)
+
+
+def update_user(directory, key, change):
+    """
+    Apply change(user) to one user's shard and write it back, under the
+    store lock. Returns the shard's (old stamp, new stamp), or None if there
+    is no such user.
+    """
+    if not os.path.exists(_index_path(directory)):
+        return None
+
+    with file_lock(_index_path(directory)):
+        old = shard_stamp(directory, key)
+        if old is None:
+            return None
+
+        user = read_shard(directory, key)
+        change(user)
+        atomic_write_json(_shard_path(directory, key), user, indent=4)
+        _bump_generation(directory)
+        return old, shard_stamp(directory, key)
+
+
+# ----- One-shot migration from the JSON user file ----- #
+
+def migrate_from_json(user_file="data/sample_user.json", directory=None):
+    """Split the JSON user file (plus its meal log) into per-user shards."""
+    directory = directory or shard_dir(user_file)
+    if os.path.exists(_index_path(directory)):
+        raise RuntimeError(f"{directory} already has data, refusing to migrate twice")
+
+    from Backend.user_loader import load_json_user_data
+    users = list(iter_users(load_json_user_data(user_file)))
+    save_users(directory, users)
+
+    print(f"Split {len(users)} users from {user_file} into {directory}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        migrate_from_json()
+    else:
+        print("Usage: python -m Backend.shard_store migrate")
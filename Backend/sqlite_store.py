@@ -0,0 +1,286 @@
+# Backend/sqlite_store.py
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+DB_FILE = "data/nutrition.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    role TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    username TEXT,
+    caretaker_id INTEGER,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (role, id)
+);
+CREATE INDEX IF NOT EXISTS idx_users_username ON users (username);
+CREATE INDEX IF NOT EXISTS idx_users_caretaker_id ON users (caretaker_id);
+CREATE TABLE IF NOT EXISTS meals (
+    meal_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    role TEXT,
+    user_id INTEGER NOT NULL,
+    date TEXT,
+    timestamp TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_meals_user_date ON meals (user_id, date);
+CREATE TABLE IF NOT EXISTS inventory (
+    id INTEGER PRIMARY KEY,
+    barcode TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_barcode ON inventory (barcode);
+CREATE TABLE IF NOT EXISTS recipes (
+    position INTEGER PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+"""
+
+USER_LISTS = (("elderly", "elderly_users"), ("caretaker", "caretaker_users"))
+
+_local = threading.local()
+
+
+# ----- Connection ----- #
+
+def get_connection(path=DB_FILE):
+    """Return this thread's connection (WAL mode, schema created on first use)."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conn
+
+
+def get_version(name, path=DB_FILE):
+    """Return the write counter for 'users' or 'inventory'."""
+    row = get_connection(path).execute(
+        "SELECT value FROM meta WHERE key = ?", (name,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _bump_version(conn, name):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, 1) "
+        "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+        (name,)
+    )
+    return conn.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()[0]
+
+
+# ----- Users + meals ----- #
+
+def load_users(path=DB_FILE):
+    """Return the same {"elderly_users": [...], "caretaker_users": [...]} document as the JSON file."""
+    conn = get_connection(path)
+
+    meals_by_user = {}
+    for role, user_id, doc in conn.execute(
+        "SELECT role, user_id, doc FROM meals ORDER BY meal_id"
+    ):
+        meals_by_user.setdefault((role, user_id), []).append(json.loads(doc))
+
+    data = {key: [] for _, key in USER_LISTS}
+    for role, user_id, doc in conn.execute(
+        "SELECT role, id, doc FROM users ORDER BY position"
+    ):
+        user = json.loads(doc)
+        meals = meals_by_user.get((user.get("role", role), user_id))
+        if meals is not None:
+            user["meals"] = meals
+        data[dict(USER_LISTS)[role]].append(user)
+
+    return data
+
+
+def _user_row(role, position, user):
+    doc = {k: v for k, v in user.items() if k != "meals"}
+    return (
+        role,
+        user["id"],
+        position,
+        user.get("account", {}).get("username"),
+        user.get("caretaker_id"),
+        json.dumps(doc)
+    )
+
+
+def save_users(data, path=DB_FILE):
+    """
+    Write user profiles. Meals are stored separately and only change
+    through add_meal/delete_meal. Returns the new users version.
+    """
+    conn = get_connection(path)
+    with conn:
+        conn.execute("DELETE FROM users")
+        conn.executemany(
+            "INSERT INTO users (role, id, position, username, caretaker_id, doc) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                _user_row(role, position, user)
+                for role, key in USER_LISTS
+                for position, user in enumerate(data.get(key, []))
+            ]
+        )
+        return _bump_version(conn, "users")
+
+
+def upsert_users(users, path=DB_FILE):
+    """
+    Insert or update just these (role, user) profiles; new users go to the
+    end of their list. Returns the new users version.
+    """
+    conn = get_connection(path)
+    with conn:
+        for role, user in users:
+            row = conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM users WHERE role = ?", (role,)
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO users (role, id, position, username, caretaker_id, doc) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (role, id) DO UPDATE SET "
+                "username = excluded.username, caretaker_id = excluded.caretaker_id, doc = excluded.doc",
+                _user_row(role, row[0], user)
+            )
+        return _bump_version(conn, "users")
+
+
+def add_meal(role, user_id, meal, path=DB_FILE):
+    """Insert one meal. Returns the new users version."""
+    conn = get_connection(path)
+    with conn:
+        conn.execute(
+            "INSERT INTO meals (role, user_id, date, timestamp, doc) VALUES (?, ?, ?, ?, ?)",
+            (role, user_id, meal.get("date"), meal.get("timestamp"), json.dumps(meal))
+        )
+        return _bump_version(conn, "users")
+
+
+def delete_meal(role, user_id, timestamp, path=DB_FILE):
+    """Delete a user's meals with the given timestamp. Returns the new users version."""
+    conn = get_connection(path)
+    with conn:
+        conn.execute(
+            "DELETE FROM meals WHERE role IS ? AND user_id = ? AND timestamp = ?",
+            (role, user_id, timestamp)
+        )
+        return _bump_version(conn, "users")
+
+
+# ----- Inventory ----- #
+
+def load_inventory(path=DB_FILE):
+    """Return inventory in the same {"items": [...]} shape as sample_food.json."""
+    rows = get_connection(path).execute("SELECT doc FROM inventory ORDER BY id")
+    return {"items": [json.loads(doc) for (doc,) in rows]}
+
+
+def save_inventory(inventory, path=DB_FILE):
+    conn = get_connection(path)
+    with conn:
+        conn.execute("DELETE FROM inventory")
+        conn.executemany(
+            "INSERT INTO inventory (id, barcode, doc) VALUES (?, ?, ?)",
+            [(i["id"], i.get("barcode"), json.dumps(i)) for i in inventory.get("items", [])]
+        )
+        return _bump_version(conn, "inventory")
+
+
+def update_inventory_rows(items, removed_ids, path=DB_FILE):
+    """Insert/replace the given items and delete removed_ids. Returns the new inventory version."""
+    conn = get_connection(path)
+    with conn:
+        if removed_ids:
+            conn.executemany("DELETE FROM inventory WHERE id = ?", [(i,) for i in removed_ids])
+        conn.executemany(
+            "INSERT OR REPLACE INTO inventory (id, barcode, doc) VALUES (?, ?, ?)",
+            [(i["id"], i.get("barcode"), json.dumps(i)) for i in items]
+        )
+        return _bump_version(conn, "inventory")
+
+
+# ----- Saved recipes ----- #
+
+def load_recipes(path=DB_FILE):
+    rows = get_connection(path).execute("SELECT doc FROM recipes ORDER BY position")
+    return [json.loads(doc) for (doc,) in rows]
+
+
+def save_recipes(recipes, path=DB_FILE):
+    conn = get_connection(path)
+    with conn:
+        conn.execute("DELETE FROM recipes")
+        conn.executemany(
+            "INSERT INTO recipes (position, doc) VALUES (?, ?)",
+            [(i, json.dumps(r)) for i, r in enumerate(recipes)]
+        )
+
+
+# ----- One-shot migration from the JSON files ----- #
+
+def migrate_from_json(
+    user_file="data/sample_user.json",
+    inventory_file="data/sample_food.json",
+    recipes_file="data/saved_recipes.json",
+    path=DB_FILE
+):
+    """Copy users, meals, inventory and saved recipes from the JSON files into SQLite."""
+    if os.path.exists(path) and get_version("users", path):
+        raise RuntimeError(f"{path} already has data, refusing to migrate twice")
+
+    from Backend.user_loader import load_json_user_data
+    data = load_json_user_data(user_file)
+
+    with open(inventory_file, "r", encoding="utf-8") as f:
+        inventory = json.load(f)
+
+    with open(recipes_file, "r", encoding="utf-8") as f:
+        recipes = json.load(f).get("recipes", [])
+
+    save_users(data, path)
+
+    conn = get_connection(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO meals (role, user_id, date, timestamp, doc) VALUES (?, ?, ?, ?, ?)",
+            [
+                (user.get("role", role), user["id"], m.get("date"), m.get("timestamp"), json.dumps(m))
+                for role, key in USER_LISTS
+                for user in data.get(key, [])
+                for m in user.get("meals", [])
+            ]
+        )
+        _bump_version(conn, "users")
+
+    save_inventory(inventory, path)
+    save_recipes(recipes, path)
+
+    print(
+        f"Migrated {sum(len(data.get(k, [])) for _, k in USER_LISTS)} users, "
+        f"{len(inventory.get('items', []))} inventory items and "
+        f"{len(recipes)} recipes into {path}"
+    )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        migrate_from_json()
+    else:
+        print("Usage: python -m Backend.sqlite_store migrate")
@@ -0,0 +1,119 @@
+# Backend/storage.py
+import json
+import os
+from pathlib import Path
+from Backend import sqlite_store
+from Backend.persistence import atomic_write_json, file_lock, file_stamp
+
+# ----- Storage backend ----- #
+# "json" (default) keeps everything in the files under data/.
+# "sqlite" uses data/nutrition.db (see Backend/sqlite_store.py); run
+#   python -m Backend.sqlite_store migrate
+# once to copy the JSON files over before switching.
+# "sharded" keeps inventory and recipes in JSON but splits the users into one
+# file each (see Backend/shard_store.py).
+#
+# JSON files are replaced atomically; read-modify-write changes should go
+# through update_inventory()/update_recipes(), which hold the file's lock.
+
+INVENTORY_FILE = Path("data/sample_food.json")
+RECIPES_FILE = "data/saved_recipes.json"
+
+
+def use_sqlite():
+    return os.getenv("STORAGE_BACKEND", "json").lower() == "sqlite"
+
+
+def use_sharded_users():
+    return os.getenv("STORAGE_BACKEND", "json").lower() == "sharded"
+
+
+# ----- Inventory ----- #
+
+def load_inventory():
+    """Load inventory JSON file, create if it doesn't exist."""
+    if use_sqlite():
+        return sqlite_store.load_inventory()
+
+    if not INVENTORY_FILE.exists():
+        return {"items": []}
+    with open(INVENTORY_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def inventory_stamp():
+    """Return a value that changes whenever the inventory is written."""
+    if use_sqlite():
+        return ("sqlite", sqlite_store.get_version("inventory"))
+
+    return file_stamp(INVENTORY_FILE)
+
+
+def _write_inventory(inventory):
+    if use_sqlite():
+        sqlite_store.save_inventory(inventory)
+    else:
+        atomic_write_json(INVENTORY_FILE, inventory, indent=2)
+
+
+def save_inventory(inventory):
+    """Save inventory back to JSON."""
+    with file_lock(INVENTORY_FILE):
+        _write_inventory(inventory)
+
+
+def update_inventory(change):
+    """
+    Load the inventory, apply change(inventory) and save it, all under the
+    inventory lock so concurrent workers don't lose each other's edits.
+    Returns whatever change() returns.
+    """
+    with file_lock(INVENTORY_FILE):
+        inventory = load_inventory()
+        if not use_sqlite():
+            result = change(inventory)
+            _write_inventory(inventory)
+            return result
+
+        # SQLite: write only the rows change() added, edited or removed
+        before = {i["id"]: json.dumps(i, sort_keys=True) for i in inventory["items"]}
+        result = change(inventory)
+        after = {i["id"]: i for i in inventory["items"]}
+        sqlite_store.update_inventory_rows(
+            [i for item_id, i in after.items() if before.get(item_id) != json.dumps(i, sort_keys=True)],
+            [item_id for item_id in before if item_id not in after]
+        )
+    return result
+
+
+# ----- Saved recipes ----- #
+
+def load_recipes():
+    """Return the list of saved recipes."""
+    if use_sqlite():
+        return sqlite_store.load_recipes()
+
+    with open(RECIPES_FILE, "r", encoding="utf-8") as f:
+        return json.load(f).get("recipes", [])
+
+
+def _write_recipes(recipes):
+    if use_sqlite():
+        sqlite_store.save_recipes(recipes)
+    else:
+        atomic_write_json(RECIPES_FILE, {"recipes": recipes}, indent=4)
+
+
+def save_recipes(recipes):
+    """Replace the list of saved recipes."""
+    with file_lock(RECIPES_FILE):
+        _write_recipes(recipes)
+
+
+def update_recipes(change):
+    """Load, change(recipes) and save the saved recipes under their lock."""
+    with file_lock(RECIPES_FILE):
+        recipes = load_recipes()
+        result = change(recipes)
+        _write_recipes(recipes)
+    return result
@@ -1,19 +1,527 @@
 # Backend/user_loader.py
 import json
+import os
+import threading
+import uuid
+from Backend import shard_store, sqlite_store
+from Backend.persistence import (
+    VersionConflict, atomic_write_json, atomic_write_text, file_lock, file_stamp
+)
+from Backend.storage import use_sharded_users, use_sqlite
 
 USER_DATA_FILE = "data/sample_user.json"
 
+# ----- Shared in-memory cache ----- #
+# One parsed copy of each user file is kept per process and only re-read when
+# the file's (mtime, size) stamp changes. Callers share the cached dict, so any
+# change made to it must be written back with save_user_data(). With the
+# SQLite backend the stamp is the database's users version instead; with the
+# sharded store it is the store's generation counter, and a reload re-parses
+# only the users whose shard changed.
+#
+# Several worker processes can share the files: writes are atomic and made
+# under the user file's advisory lock, and save_user_data() writes only the
+# changed users over the file as it is at that moment (see
+# Backend/persistence.py). Whole-document saves pass the stamp they loaded
+# and get VersionConflict if another worker wrote since.
 
-def load_user_data(path=USER_DATA_FILE):
-    """Load full user JSON (elderly + caretakers)."""
+_cache = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "shards_parsed": 0}
+
+# ----- Meal log ----- #
+# Logged and deleted meals are appended to a JSON Lines file next to the user
+# file instead of rewriting the whole document. Loads replay only the records
+# added since the last load; once the log grows past MEAL_LOG_COMPACT_AT
+# records it is folded back into the user file and truncated. The sharded
+# store has no log: a meal rewrites just that user's shard.
+#
+# Each log starts with a {"log_id": ...} header, and a fold records the log id
+# and byte offset it folded under "meal_log" in the user file before the log
+# is replaced. A crash between the two steps leaves a log whose records the
+# user file already has; replay skips them instead of adding them twice.
+
+MEAL_LOG_COMPACT_AT = 500
+
+# ----- Derived state ----- #
+# Other modules can keep state computed from the cached data (lookup tables,
+# nutrition rollups, ...) with get_derived(). It is dropped whenever the data
+# is reloaded or saved; meal hooks let it follow meal log records in between.
+
+_meal_hooks = []
+
+
+def meal_log_path(path=USER_DATA_FILE):
+    """Return the meal log file that belongs to a user file."""
+    return os.path.splitext(path)[0] + ".meals.jsonl"
+
+
+def _apply_meal_op(u, record):
+    """Apply a meal log record to one user; returns (added, removed) meals."""
+    added, removed = [], []
+    if record["op"] == "add":
+        u.setdefault("meals", []).append(record["meal"])
+        added.append(record["meal"])
+    elif record["op"] == "delete":
+        kept = []
+        for m in u.get("meals", []):
+            (removed if m.get("timestamp") == record["timestamp"] else kept).append(m)
+        u["meals"] = kept
+    return added, removed
+
+
+def _apply_meal_record(entry, record):
+    data = entry["data"]
+    role = record.get("role")
+    for u in data.get("elderly_users", []) + data.get("caretaker_users", []):
+        if u["id"] == record["user_id"] and u.get("role") == role:
+            break
+    else:
+        return
+
+    added, removed = _apply_meal_op(u, record)
+
+    derived = entry.get("derived")
+    if derived:
+        for hook in _meal_hooks:
+            hook(derived, u, added, removed)
+
+
+def _read_log_header(f):
+    """The log id and where records start, for a log opened at offset 0."""
+    line = f.readline()
+    if line.endswith("\n"):
+        header = json.loads(line)
+        if "log_id" in header:
+            return header["log_id"], len(line.encode("utf-8"))
+    return None, 0  # logs written before headers existed
+
+
+def _start_meal_log(path):
+    atomic_write_text(meal_log_path(path), json.dumps({"log_id": uuid.uuid4().hex}) + "\n")
+
+
+def _replay_meal_log(entry, path):
+    """Apply meal log records written since this cache entry last looked."""
+    log_path = meal_log_path(path)
+    if not os.path.exists(log_path):
+        return
+
+    with open(log_path, "r", encoding="utf-8") as f:
+        if entry["log_offset"] == 0:
+            log_id, entry["log_offset"] = _read_log_header(f)
+            entry["log_id"] = log_id
+            folded = entry["data"].get("meal_log") or {}
+            if folded and folded.get("id") == log_id:
+                # Already folded into the user file (the log wasn't replaced)
+                entry["log_offset"] = max(entry["log_offset"], folded["offset"])
+
+        f.seek(entry["log_offset"])
+        for line in f:
+            if not line.endswith("\n"):
+                break  # partially written record, pick it up next time
+            _apply_meal_record(entry, json.loads(line))
+            entry["log_offset"] += len(line.encode("utf-8"))
+            entry["log_records"] += 1
+
+
+def _new_entry(stamp, data, previous=None):
+    return {
+        "stamp": stamp,
+        "data": data,
+        "version": previous["version"] + 1 if previous else 1,
+        "log_offset": 0,
+        "log_records": 0
+    }
+
+
+def _load_cached(key, stamp, read, log_source=None):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry["stamp"] == stamp:
+            _cache_stats["hits"] += 1
+            if log_source:
+                _replay_meal_log(entry, log_source)
+            return entry
+        _cache_stats["misses"] += 1
+
+    # Re-read outside the cache lock. A JSON user file and its meal log are
+    # read together under a shared file lock, so a compaction in another
+    # worker is never seen half-done.
+    if log_source:
+        with file_lock(log_source, shared=True):
+            fresh = _new_entry(file_stamp(log_source), read())
+            _replay_meal_log(fresh, log_source)
+    else:
+        fresh = _new_entry(stamp, read())
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry["stamp"] == fresh["stamp"]:
+            # Another thread loaded the same version meanwhile
+            if log_source:
+                _replay_meal_log(entry, log_source)
+            return entry
+
+        fresh["version"] = entry["version"] + 1 if entry else 1
+        _cache[key] = fresh
+        return fresh
+
+
+def _store_cached(key, stamp, data):
+    _cache[key] = _new_entry(stamp, data, _cache.get(key))
+
+
+def _cache_key(path):
+    if use_sqlite():
+        return "sqlite"
+    if use_sharded_users():
+        return os.path.abspath(shard_store.shard_dir(path))
+    return os.path.abspath(path)
+
+
+def _read_json(path):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
-def save_user_data(data, path=USER_DATA_FILE):
-    """Save full user JSON."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+def _load_json_entry(path):
+    return _load_cached(
+        os.path.abspath(path), file_stamp(path), lambda: _read_json(path), path
+    )
+
+
+def load_json_user_data(path=USER_DATA_FILE):
+    """Load the JSON user file (plus its meal log) whatever the storage backend."""
+    return _load_json_entry(path)["data"]
+
+
+def _load_sharded(path):
+    directory = shard_store.shard_dir(path)
+    key = _cache_key(path)
+    stamp = shard_store.generation(directory)
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry["stamp"] == stamp:
+            _cache_stats["hits"] += 1
+            return entry
+        _cache_stats["misses"] += 1
+        previous = entry["data"] if entry else None
+        known = dict(entry["shards"]) if entry else None
+
+    data, stamps, parsed = shard_store.load_users(directory, previous, known)
+
+    with _cache_lock:
+        _cache_stats["shards_parsed"] += parsed
+        current = _cache.get(key)
+        if current is not None and current is entry and not parsed and stamps == entry["shards"]:
+            # Only this process's own meal writes (already applied): keep the
+            # cached copy and its derived state
+            entry["stamp"] = stamp
+            return entry
+
+        fresh = _new_entry(stamp, data, current)
+        fresh["shards"] = stamps
+        _cache[key] = fresh
+        return fresh
+
+
+def _load_entry(path):
+    if use_sqlite():
+        return _load_cached(
+            "sqlite", sqlite_store.get_version("users"), sqlite_store.load_users
+        )
+    if use_sharded_users():
+        return _load_sharded(path)
+    return _load_json_entry(path)
+
+
+def load_user_data(path=USER_DATA_FILE):
+    """Load full user JSON (elderly + caretakers), cached until the file changes."""
+    return _load_entry(path)["data"]
+
+
+def load_user_data_with_stamp(path=USER_DATA_FILE):
+    """
+    Return (data, stamp). Hand the stamp back to save_user_data() so it can
+    tell whether another worker wrote since this copy was loaded.
+    """
+    entry = _load_entry(path)
+    with _cache_lock:
+        return entry["data"], entry["stamp"]
+
+
+def _merge_dirty_users(fresh, data, dirty):
+    """
+    Copy the users in dirty ((role, id) pairs, None for all of them) from
+    data into fresh, the current copy on disk. Meals are kept from fresh
+    since they only change through the meal log.
+    """
+    ours = {
+        (u.get("role"), u["id"]): (list_name, u)
+        for list_name in ("elderly_users", "caretaker_users")
+        for u in data.get(list_name, [])
+    }
+
+    for key in (ours if dirty is None else dirty):
+        if key not in ours:
+            continue
+        list_name, user = ours[key]
+        users = fresh.setdefault(list_name, [])
+        for i, u in enumerate(users):
+            if (u.get("role"), u["id"]) == key:
+                users[i] = {**user, "meals": u.get("meals", [])}
+                break
+        else:
+            users.append(user)  # registered since fresh was written
+
+    return fresh
+
+
+def _check_stamp(current, stamp, dirty, what):
+    # Without dirty the caller owns every user, so refuse if anyone else wrote
+    if dirty is None and stamp is not None and current != stamp:
+        raise VersionConflict(what)
+
+
+def _save_sqlite(data, dirty, stamp):
+    with file_lock(sqlite_store.DB_FILE):
+        if dirty is None:
+            _check_stamp(sqlite_store.get_version("users"), stamp, dirty, sqlite_store.DB_FILE)
+            version = sqlite_store.save_users(data)
+            with _cache_lock:
+                _store_cached("sqlite", version, data)
+            return
+
+        # Rows are per user, so only the dirty ones are written
+        version = sqlite_store.upsert_users([
+            (role, u)
+            for role, list_name in sqlite_store.USER_LISTS
+            for u in data.get(list_name, [])
+            if (u.get("role"), u["id"]) in dirty
+        ])
+
+        # If nobody else wrote in between, swap the saved users into a copy of
+        # the cached document (keeping its meals) instead of reloading it all
+        with _cache_lock:
+            entry = _cache.get("sqlite")
+            if entry and entry["stamp"] == version - 1:
+                cached = entry["data"]
+                merged = {**cached, **{k: list(cached.get(k, [])) for _, k in sqlite_store.USER_LISTS}}
+                _store_cached("sqlite", version, _merge_dirty_users(merged, data, dirty))
+
+
+def _save_sharded(data, path, dirty, stamp):
+    directory = shard_store.shard_dir(path)
+    _check_stamp(shard_store.generation(directory), stamp, dirty, directory)
+
+    def merge(user, on_disk):
+        # Same rule as _merge_dirty_users: our profile, the stored meals
+        return {**user, "meals": on_disk.get("meals", [])}
+
+    # Only the users this request changed are written; the cache picks
+    # them up (by shard stamp) on the next load
+    users = [(k, u) for k, u in shard_store.iter_users(data) if dirty is None or k in dirty]
+    shard_store.save_users(directory, users, merge)
+
+
+def save_user_data(data, path=USER_DATA_FILE, dirty=None, stamp=None):
+    """
+    Save user data (folding in the meal log) and keep the cache in sync.
+
+    The users listed in dirty ((role, id) pairs) are written over the
+    current copy on disk, keeping everything other workers saved for the
+    rest. With dirty=None every user in data is written; pass the stamp
+    from load_user_data_with_stamp() and VersionConflict is raised instead
+    if another worker wrote since.
+    """
+    if use_sqlite():
+        _save_sqlite(data, dirty, stamp)
+        return
+    if use_sharded_users():
+        _save_sharded(data, path, dirty, stamp)
+        return
+
+    key = os.path.abspath(path)
+    with file_lock(path):
+        current = file_stamp(path)
+        _check_stamp(current, stamp, dirty, path)
+
+        # Always merge into the file as it is now (plus its log), so neither
+        # other workers' users nor their logged meals are lost
+        fresh = _new_entry(current, _read_json(path))
+        _replay_meal_log(fresh, path)
+        data = _merge_dirty_users(fresh["data"], data, dirty)
+
+        # data already holds every replayed meal: note how far into which log,
+        # then start a new log
+        data["meal_log"] = {"id": fresh.get("log_id"), "offset": fresh["log_offset"]}
+        atomic_write_json(path, data, indent=4)
+        _start_meal_log(path)
+
+        with _cache_lock:
+            _store_cached(key, file_stamp(path), data)
+
+
+def _append_meal_record(record, path):
+    if use_sqlite():
+        if record["op"] == "add":
+            version = sqlite_store.add_meal(record["role"], record["user_id"], record["meal"])
+        else:
+            version = sqlite_store.delete_meal(record["role"], record["user_id"], record["timestamp"])
+
+        # Apply in place if nobody else wrote in between, otherwise reload next time
+        with _cache_lock:
+            entry = _cache.get("sqlite")
+            if entry and entry["stamp"] == version - 1:
+                _apply_meal_record(entry, record)
+                entry["stamp"] = version
+        return
+
+    if use_sharded_users():
+        key = (record["role"], record["user_id"])
+        stamps = shard_store.update_user(
+            shard_store.shard_dir(path), key, lambda u: _apply_meal_op(u, record)
+        )
+
+        # Same as SQLite: apply in place only if we had the previous version
+        with _cache_lock:
+            entry = _cache.get(_cache_key(path))
+            if entry and stamps is not None and entry["shards"].get(key) == stamps[0]:
+                _apply_meal_record(entry, record)
+                entry["shards"][key] = stamps[1]
+        return
+
+    # Same lock as save_user_data, so a compaction can't truncate the log
+    # between our write and the user file being replaced
+    with file_lock(path):
+        if not os.path.exists(meal_log_path(path)):
+            _start_meal_log(path)
+        with open(meal_log_path(path), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    # Catch the cached copy up (this applies the record we just wrote)
+    load_user_data(path)
+
+    entry = _cache[os.path.abspath(path)]
+    if entry["log_records"] >= MEAL_LOG_COMPACT_AT:
+        compact_meal_log(path)
+
+
+def append_meal(user, meal, path=USER_DATA_FILE):
+    """Log a meal for a user without rewriting the user file."""
+    _append_meal_record(
+        {"op": "add", "role": user.get("role"), "user_id": user["id"], "meal": meal},
+        path
+    )
+
+
+def remove_meal(user, timestamp, path=USER_DATA_FILE):
+    """Delete a user's meal (matched by timestamp) via the meal log."""
+    _append_meal_record(
+        {"op": "delete", "role": user.get("role"), "user_id": user["id"], "timestamp": timestamp},
+        path
+    )
+
+
+def compact_meal_log(path=USER_DATA_FILE):
+    """Fold the meal log into the user file and truncate it."""
+    # Nothing is dirty: the file is rewritten as it is on disk plus the log
+    save_user_data({}, path, dirty=set())
+
+
+def get_data_version(path=USER_DATA_FILE):
+    """Return the cache version of a user file (bumps on every reload or save)."""
+    load_user_data(path)
+    return _cache[_cache_key(path)]["version"]
+
+
+def get_cache_stats():
+    """Return cache hit/miss counters."""
+    with _cache_lock:
+        return dict(_cache_stats)
+
+
+def clear_user_cache():
+    """Drop all cached user files (next load re-reads from disk)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def get_derived(data, key, build):
+    """
+    Return state derived from a cached user document, calling build() only
+    the first time for this data version.
+    """
+    with _cache_lock:
+        for entry in _cache.values():
+            if entry["data"] is data:
+                derived = entry.setdefault("derived", {})
+                if key not in derived:
+                    derived[key] = build()
+                return derived[key]
+
+    # Not the cached copy (e.g. a hand-built dict), build without caching
+    return build()
+
+
+def register_meal_hook(hook):
+    """
+    Call hook(derived, user, added_meals, removed_meals) whenever a meal
+    record is applied to cached data that has derived state.
+    """
+    _meal_hooks.append(hook)
+
+
+# ----- User lookups ----- #
+# Lookup tables are derived state, so they are built once per data version
+# (meal changes don't touch them).
+
+def _build_index(data):
+    index = {
+        "elderly_by_id": {},
+        "caretaker_by_id": {},
+        "by_username": {},
+        "elderly_by_caretaker": {}
+    }
+
+    for e in data.get("elderly_users", []):
+        index["elderly_by_id"].setdefault(e["id"], e)
+        index["by_username"].setdefault(e["account"]["username"], e)
+        if e.get("caretaker_id") is not None:
+            index["elderly_by_caretaker"].setdefault(e["caretaker_id"], []).append(e)
+
+    for c in data.get("caretaker_users", []):
+        index["caretaker_by_id"].setdefault(c["id"], c)
+        index["by_username"].setdefault(c["account"]["username"], c)
+
+    return index
+
+
+def get_user_index(data=None, path=USER_DATA_FILE):
+    """Return id/username/caretaker lookup tables for the (cached) user data."""
+    if data is None:
+        data = load_user_data(path)
+    return get_derived(data, "index", lambda: _build_index(data))
+
+
+def find_user(role, user_id, data=None):
+    """Return the elderly or caretaker user with this id, or None."""
+    index = get_user_index(data)
+    if role == "caretaker":
+        return index["caretaker_by_id"].get(user_id)
+    return index["elderly_by_id"].get(user_id)
+
+
+def find_user_by_username(username, data=None):
+    """Return the user (elderly or caretaker) with this username, or None."""
+    return get_user_index(data)["by_username"].get(username)
+
+
+def find_elderly_for_caretaker(caretaker_id, data=None):
+    """Return the elderly users linked to a caretaker."""
+    return get_user_index(data)["elderly_by_caretaker"].get(caretaker_id, [])
 
 
 def load_elderly_users(path=USER_DATA_FILE):
@@ -24,17 +532,7 @@ def load_elderly_users(path=USER_DATA_FILE):
 
 def username_exists(username, path=USER_DATA_FILE):
     """Check if username exists across ALL users."""
-    data = load_user_data(path)
-
-    for e in data.get("elderly_users", []):
-        if e["account"]["username"] == username:
-            return True
-
-    for c in data.get("caretaker_users", []):
-        if c["account"]["username"] == username:
-            return True
-
-    return False
+    return username in get_user_index(path=path)["by_username"]
 
 def load_users(path=USER_DATA_FILE):
     """Return all users (elderly + caretaker) in a single list."""
@@ -46,7 +544,10 @@ def load_elderly_users_with_caretakers(path=USER_DATA_FILE):
     Return elderly users with their caretaker object attached
     as 'caretaker' key.
     """
-    data = load_user_data(path)
+    return attach_caretakers(load_user_data(path))
+
+def attach_caretakers(data):
+    """Same as load_elderly_users_with_caretakers, for already-loaded data."""
     caretakers_by_id = {c['id']: c for c in data.get("caretaker_users", [])}
 
     elderly_users = []
@@ -60,4 +561,3 @@ def load_elderly_users_with_caretakers(path=USER_DATA_FILE):
         elderly_users.append(user_copy)
 
     return elderly_users
-
@@ -1,5 +1,6 @@
 from flask import Flask, session
-from Backend.user_loader import load_user_data
+from services import data_context, recipe_scheduler
+from services.data_context import get_user_data
 from utils.helpers import get_target_user
 from extensions import bcrypt
 
@@ -8,15 +9,15 @@ def create_app():
     app.secret_key = "supersecretkey"
 
     bcrypt.init_app(app)
+    data_context.init_app(app)
+    recipe_scheduler.init_app(app)
 
     @app.context_processor
     def inject_user_data():
-        from Backend.user_loader import load_user_data
-
         user = session.get("user")
 
         if user:
-            data = load_user_data()
+            data = get_user_data()
             u = get_target_user(data, user)
 
             return {
@@ -34,7 +35,7 @@ def create_app():
         if not session.get("user"):
             return {}
 
-        data = load_user_data()
+        data = get_user_data()
         session_user = session.get("user")
 
         # reuse your helper
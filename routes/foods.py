@@ -1,34 +1,19 @@
 from flask import Blueprint, render_template, request, redirect, session, url_for
-from Backend.scanner import lookup_product, add_item_to_inventory
-from Backend.user_loader import load_user_data
-import json
+from Backend.scanner import lookup_product, add_item_to_inventory, ingest_barcodes, MAX_BULK_BARCODES
+from Backend.storage import load_inventory, update_inventory
+from services.data_context import get_user_data
+from utils.helpers import get_target_user
 from datetime import datetime
 
 foods_bp = Blueprint("foods", __name__)
 
-def get_target_user(data, session_user):
-    """Returns the elderly user being viewed (caretaker or self)."""
-
-    if session_user.get("role") == "caretaker":
-        for u in data.get("elderly_users", []):
-            if u.get("caretaker_id") == session_user["id"]:
-                return u
-
-    elif session_user.get("role") == "elderly":
-        return next(
-            (u for u in data.get("elderly_users", []) if u["id"] == session_user["id"]),
-            None
-        )
-
-    return None
-
 @foods_bp.route("/foods", methods=["GET", "POST"])
 def foods():
     if not session.get("user"):
         return redirect("/login")
 
     session_user = session["user"]
-    data = load_user_data()
+    data = get_user_data()
 
     target_user = get_target_user(data, session_user)
 
@@ -50,8 +35,7 @@ def foods():
         else:
             message = "Product not found."
 
-    with open("data/sample_food.json") as f:
-        foods = json.load(f).get("items", [])
+    foods = load_inventory().get("items", [])
 
     return render_template(
         "foods.html",
@@ -64,14 +48,52 @@ def foods():
     )
 
 
+@foods_bp.post("/foods/bulk")
+def bulk_add_foods():
+    if not session.get("user"):
+        return redirect("/login")
+
+    session_user = session["user"]
+    data = get_user_data()
+
+    target_user = get_target_user(data, session_user)
+
+    if not target_user:
+        return redirect("/login")
+
+    # One barcode per line (commas / spaces also work); each distinct code once
+    raw = request.form.get("barcodes", "")
+    barcodes = list(dict.fromkeys(b for b in raw.replace(",", " ").split() if b.strip()))
+
+    status = 200
+    if len(barcodes) > MAX_BULK_BARCODES:
+        message = f"Too many barcodes ({len(barcodes)}); add at most {MAX_BULK_BARCODES} at once."
+        status = 400
+    else:
+        added, not_found = ingest_barcodes(barcodes)
+
+        message = f"Added {len(added)} item{'s' if len(added) != 1 else ''}."
+        if not_found:
+            message += f" Not found: {', '.join(not_found)}"
+
+    foods = load_inventory().get("items", [])
+
+    return render_template(
+        "foods.html",
+        foods=foods,
+        message=message,
+        product=None,
+        scanned_at=None,
+        viewer=session_user,
+        user=target_user
+    ), status
+
+
 @foods_bp.post("/foods/<int:food_id>/delete")
 def delete_food(food_id):
-    with open("data/sample_food.json") as f:
-        data = json.load(f)
-
-    data["items"] = [i for i in data["items"] if int(i.get("id", -1)) != food_id]
+    def delete(data):
+        data["items"] = [i for i in data["items"] if int(i.get("id", -1)) != food_id]
 
-    with open("data/sample_food.json", "w") as f:
-        json.dump(data, f, indent=4)
+    update_inventory(delete)
 
     return redirect(url_for("foods.foods"))
\ No newline at end of file
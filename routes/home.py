@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, session, redirect
-from Backend.user_loader import load_user_data
-from services.nutrition_service import *
+from services.data_context import get_user_data
+from utils.helpers import get_target_user
+from services.nutrition_service import aggregate_nutrition
 
 home_bp = Blueprint("home", __name__)
 
@@ -11,40 +12,16 @@ def home():
     
     user = session["user"]
 
-    data = load_user_data()
-    target_user = None
+    data = get_user_data()
 
-    # If caretaker → find their elderly user
-    if user.get("role") == "caretaker":
-      if user.get("role") == "caretaker":
-        for u in data.get("elderly_users", []):
-            if u.get("caretaker_id") == user["id"]:
-                target_user = u
-                break
-
-    # If elderly → they are the target
-    elif user.get("role") == "elderly":
-        for u in data.get("elderly_users", []):
-            if u["id"] == user["id"]:
-                target_user = u
-                break
+    # Caretaker → their elderly user, elderly → themselves
+    target_user = get_target_user(data, user)
 
     nutrition_data = None
 
     if target_user:
-        calorie_totals = track_calories(target_user)
-        protein_totals = track_protein(target_user)
-        cholesterol_totals = track_cholesterol(target_user)
-        sugar_totals = track_sugar(target_user)
-        sodium_totals = track_sodium(target_user)
-
-        nutrition_data = {
-            "calories": calorie_totals,
-            "protein": protein_totals,
-            "cholesterol": cholesterol_totals,
-            "sugar": sugar_totals,
-            "sodium": sodium_totals
-        }
+        # calories, protein, cholesterol, sugar, sodium -> goal/consumed/remaining
+        nutrition_data = aggregate_nutrition(target_user)
     
     # Get nutrition data if user is elderly
     # nutrition_data = None
@@ -1,34 +1,25 @@
-from flask import Blueprint, render_template, session, redirect, request
-from Backend.user_loader import load_user_data, save_user_data
-from Backend.food_loader import load_foods
-from Backend.recipe import generate_recipe
-from utils.helpers import has_ingredients_for_recipe
+from flask import (
+    Blueprint, render_template, session, redirect, request, url_for, jsonify,
+    Response, stream_with_context
+)
+from Backend.user_loader import append_meal, remove_meal
+from services.data_context import get_user_data
+from Backend.food_loader import load_foods, get_food_catalog
+from Backend.food_filter import get_safe_foods
+from services.recipe_jobs import submit_recipe_job, get_job, try_stream_slot, release_stream_slot
+from services.recipe_scheduler import next_meal, peek_recipe
+from Backend.recipe import stream_recipe, recipe_events
+from Backend.local_recipe import generate_local_recipe
+from Backend.storage import load_recipes
+from utils.helpers import (
+    has_ingredients_for_recipe, check_recipes_availability, get_target_user, get_session_user
+)
 import json
 from datetime import datetime
 
 meals_bp = Blueprint("meals", __name__)
 
 
-# =========================
-# HELPERS
-# =========================
-def get_target_user(data, session_user):
-    """Returns the elderly user being viewed (caretaker or self)."""
-
-    if session_user.get("role") == "caretaker":
-        for u in data.get("elderly_users", []):
-            if u.get("caretaker_id") == session_user["id"]:
-                return u
-
-    elif session_user.get("role") == "elderly":
-        return next(
-            (u for u in data.get("elderly_users", []) if u["id"] == session_user["id"]),
-            None
-        )
-
-    return None
-
-
 # =========================
 # MEALS PAGE
 # =========================
@@ -38,14 +29,15 @@ def meals():
         return redirect("/login")
 
     session_user = session["user"]
-    data = load_user_data()
+    data = get_user_data()
 
     target_user = get_target_user(data, session_user)
 
     if not target_user:
         return redirect("/login")
 
-    foods = load_foods()
+    catalog = get_food_catalog()
+    foods = catalog.foods
 
     # =====================
     # ADD FOOD MEAL
@@ -55,7 +47,7 @@ def meals():
         quantity = float(request.form["quantity"])
         meal_type = request.form["meal_type"]
 
-        food = next((f for f in foods if f["id"] == food_id), None)
+        food = catalog.get(food_id)
         if not food:
             return redirect("/meals")
 
@@ -74,27 +66,16 @@ def meals():
             "allergens": food.get("allergens", [])
         }
 
-        target_user.setdefault("meals", []).append(meal)
-        save_user_data(data)
+        append_meal(target_user, meal)
 
         return redirect("/meals")
 
     # =====================
     # LOAD RECIPES
     # =====================
-    with open("data/saved_recipes.json") as f:
-        recipe_data = json.load(f)
-
-    recipes = recipe_data.get("recipes", [])
-
-    recipe_availability = []
-    for recipe in recipes:
-        has_all, missing = has_ingredients_for_recipe(recipe)
-        recipe_availability.append({
-            "recipe": recipe,
-            "has_all": has_all,
-            "missing": missing
-        })
+    recipes = load_recipes()
+
+    recipe_availability = check_recipes_availability(recipes)
     
     today_str = datetime.now().strftime("%Y-%m-%d")
     todays_meals = [
@@ -102,12 +83,19 @@ def meals():
         if m.get("date") == today_str
     ]
 
+    # Recipe pre-generated for the next meal, if the scheduler already made it
+    next_meal_type, _ = next_meal(target_user)
+    suggested_recipe = peek_recipe(next_meal_type, target_user)
+
     return render_template(
         "meals.html",
         foods=foods,
         user_meals=todays_meals,
         recipes=recipes,
         recipe_availability=recipe_availability,
+        generated_recipe=suggested_recipe,
+        generated_meal_type=next_meal_type,
+        pregenerated=suggested_recipe is not None,
         viewer=session_user,
         user=target_user
     )
@@ -122,7 +110,7 @@ def delete_meal():
         return redirect("/login")
 
     session_user = session["user"]
-    data = load_user_data()
+    data = get_user_data()
 
     target_user = get_target_user(data, session_user)
 
@@ -131,93 +119,93 @@ def delete_meal():
 
     timestamp = request.form["timestamp"]
 
-    target_user["meals"] = [
-        m for m in target_user.get("meals", [])
-        if m["timestamp"] != timestamp
-    ]
-
-    save_user_data(data)
+    remove_meal(target_user, timestamp)
 
     return redirect("/meals")
 
+def _job_owner(session_user):
+    return ((session_user.get("role") or "").lower(), session_user["id"])
+
 @meals_bp.route("/generate_recipe", methods=["POST"])
 def generate_recipe_route():
     if not session.get("user"):
         return redirect("/login")
 
-    # Load user data (same as /meals)
     session_user = session["user"]
-    data = load_user_data()
-    user_id = session["user"]["id"]
-    user = None
+    data = get_user_data()
+
+    # 🔥 NEW: GENERATE AI RECIPE in the background (for the elderly user being viewed)
+    meal_type = request.form.get("meal_type", "dinner")
+    job_id = submit_recipe_job(_job_owner(session_user), meal_type, get_target_user(data, session_user))
+    if job_id is None:
+        return "Too many recipes are being generated right now. Please try again in a minute. <br><a href='/meals'>Go back</a>", 503
 
-    for u in data.get("elderly_users", []) + data.get("caretaker_users", []):
-        if u["id"] == user_id:
-            user = u
-            break
+    return redirect(url_for("meals.generated_recipe_page", job_id=job_id))
+
+@meals_bp.get("/generate_recipe/stream")
+def generate_recipe_stream():
+    if not session.get("user"):
+        return jsonify({"error": "not logged in"}), 401
+
+    data = get_user_data()
+    user = get_target_user(data, session["user"])
+    meal_type = request.args.get("meal_type", "dinner")
+
+    # All streaming slots busy: the page falls back to the background job
+    if not try_stream_slot():
+        return jsonify({"error": "busy"}), 503
+
+    # Server-sent events: one event per recipe part as soon as it is parsed
+    def events():
+        for event, value in stream_recipe(meal_type, user):
+            if event == "error":
+                # Model unavailable: send the local recipe instead
+                local = generate_local_recipe(meal_type, user)
+                if local:
+                    for event, value in recipe_events(local):
+                        yield f"event: {event}\ndata: {json.dumps(value)}\n\n"
+                    return
+            yield f"event: {event}\ndata: {json.dumps(value)}\n\n"
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Runs when the server closes the response, even if the client went away
+    response.call_on_close(release_stream_slot)
+    return response
+
+@meals_bp.get("/generate_recipe/<job_id>")
+def generated_recipe_page(job_id):
+    if not session.get("user"):
+        return redirect("/login")
+
+    session_user = session["user"]
+    job = get_job(job_id, _job_owner(session_user))
+    if not job:
+        return redirect("/meals")
+
+    # Load user data (same as /meals)
+    data = get_user_data()
+    user = get_session_user(data, session_user)
 
     user_meals = user.get("meals", []) if user else []
 
     foods = load_foods()
 
-    # ✅ FILTER FOODS (same as your route)
+    # ✅ FILTER FOODS (allergies + dietary restrictions, cached per user)
     user_allergies = []
     if user:
         user_allergies = user.get("allergies", [])
-        filtered_foods = []
-
-        for f in foods:
-            safe = True
-            for allergen in user_allergies:
-                for a in f.get("allergens", []):
-                    if allergen.lower() == a.lower():
-                        safe = False
-                        break
-                if not safe:
-                    break
-            if safe:
-                filtered_foods.append(f)
-
-        foods = filtered_foods
+        foods = get_safe_foods(user)
 
     # ✅ LOAD SAVED RECIPES (same as your route)
-    with open("data/saved_recipes.json") as f:
-        recipe_data = json.load(f)
-
-    recipes = recipe_data.get("recipes", [])
-
-    recipe_availability = []
-    for recipe in recipes:
-        has_all, missing = has_ingredients_for_recipe(recipe)
-        recipe_availability.append({
-            "recipe": recipe,
-            "has_all": has_all,
-            "missing": missing
-        })
-
-    # 🔥 NEW: GENERATE AI RECIPE
-    meal_type = request.form.get("meal_type", "dinner")
-    recipe_json = generate_recipe(meal_type)
-
-    try:
-        recipe_json = generate_recipe(meal_type)
-
-        print("RAW AI RESPONSE:")
-        print(recipe_json)
-
-        # 🔥 REMOVE ```json and ```
-        if recipe_json.startswith("```"):
-            recipe_json = recipe_json.strip("`")          # remove backticks
-            recipe_json = recipe_json.replace("json\n", "")  # remove 'json\n'
+    recipes = load_recipes()
 
-        generated_recipe = json.loads(recipe_json)
+    recipe_availability = check_recipes_availability(recipes)
 
-    except Exception as e:
-        print("AI ERROR:", e)
-        print("CLEANED RESPONSE:", recipe_json)
-        generated_recipe = None
-
-    # ✅ RETURN SAME TEMPLATE + ONE EXTRA VARIABLE
+    # ✅ RETURN SAME TEMPLATE + THE JOB (result is ready or being polled for)
     return render_template(
     "meals.html",
     foods=foods,
@@ -225,11 +213,32 @@ def generate_recipe_route():
     user_allergies=user_allergies,
     recipes=recipes,
     recipe_availability=recipe_availability,
-    generated_recipe=generated_recipe,
+    generated_recipe=job["result"],
+    generated_meal_type=job["meal_type"],
+    recipe_job=job,
     viewer=session_user,   # ✅ ADD THIS
     user=user              # ✅ ADD THIS
 )
 
+@meals_bp.get("/generate_recipe/<job_id>/status")
+def generate_recipe_status(job_id):
+    if not session.get("user"):
+        return jsonify({"error": "not logged in"}), 401
+
+    job = get_job(job_id, _job_owner(session["user"]))
+    if not job:
+        return jsonify({"error": "unknown job"}), 404
+
+    return jsonify({
+        "id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "queue_position": job.get("queue_position"),
+        "error": job["error"],
+        "source": job["source"],
+        "recipe": job["result"]
+    })
+
 @meals_bp.post("/log_recipe_meal")
 def log_recipe_meal():
     if not session.get("user"):
@@ -239,10 +248,7 @@ def log_recipe_meal():
     meal_type = request.form.get("meal_type", "dinner")
 
     # Load recipes
-    with open("data/saved_recipes.json") as f:
-        data = json.load(f)
-
-    recipes = data.get("recipes", [])
+    recipes = load_recipes()
 
     if recipe_index >= len(recipes):
         return redirect("/meals")
@@ -267,15 +273,10 @@ def log_recipe_meal():
         "ingredients": recipe["ingredients"]
     }
 
-    data = load_user_data()
-    user_id = session["user"]["id"]
-
-    for u in data.get("elderly_users", []) + data.get("caretaker_users", []):
-        if u["id"] == user_id:
-            u.setdefault("meals", []).append(meal)
-            break
+    user = get_session_user(get_user_data(), session["user"])
 
-    save_user_data(data)
+    if user:
+        append_meal(user, meal)
 
     return redirect("/meals")
 
@@ -309,15 +310,10 @@ def log_generated_meal():
     }
 
     # Load users
-    data = load_user_data()
-    user_id = session["user"]["id"]
-
     # Find user safely
-    for u in data.get("elderly_users", []) + data.get("caretaker_users", []):
-        if u.get("id") == user_id:
-            u.setdefault("meals", []).append(meal)
-            break
+    user = get_session_user(get_user_data(), session["user"])
 
-    save_user_data(data)
+    if user:
+        append_meal(user, meal)
 
     return redirect("/meals")
\ No newline at end of file
@@ -1,44 +1,21 @@
-from flask import Blueprint, render_template, session, redirect
-from Backend.user_loader import load_user_data
-from services.nutrition_service import (
-    track_calories,
-    track_protein,
-    track_cholesterol,
-    track_sugar,
-    track_sodium
-)
-from datetime import datetime
+from flask import Blueprint, render_template, session, redirect, request, jsonify
+from services.data_context import get_user_data
+from utils.helpers import get_target_user
+from services.nutrition_service import aggregate_nutrition
+from services.nutrition_rollups import get_rollups
+from services.nutrition_analytics import nutrition_trends, MAX_TREND_DAYS
+from datetime import date, datetime
 
 nutrition_bp = Blueprint("nutrition", __name__)
 
 
-def get_target_user(data, session_user):
-    role = session_user.get("role", "").lower()
-
-    if role == "caretaker":
-        return next(
-            (u for u in data.get("elderly_users", [])
-             if u.get("caretaker_id") == session_user["id"]),
-            None
-        )
-
-    elif role == "elderly":
-        return next(
-            (u for u in data.get("elderly_users", [])
-             if u["id"] == session_user["id"]),
-            None
-        )
-
-    return None
-
-
 @nutrition_bp.route("/nutrition")
 def nutrition():
     if not session.get("user"):
         return redirect("/login")
 
     session_user = session["user"]
-    data = load_user_data()
+    data = get_user_data()
 
     # 🔥 FIX: use target user
     user = get_target_user(data, session_user)
@@ -46,12 +23,13 @@ def nutrition():
     if not user:
         return redirect("/home")
 
-    # --- Nutrition calculations ---
-    calories = track_calories(user)
-    protein = track_protein(user)
-    cholesterol = track_cholesterol(user)
-    sugar = track_sugar(user)
-    sodium = track_sodium(user)
+    # --- Nutrition calculations (one pass over today's meals) ---
+    totals = aggregate_nutrition(user)
+    calories = totals["calories"]
+    protein = totals["protein"]
+    cholesterol = totals["cholesterol"]
+    sugar = totals["sugar"]
+    sodium = totals["sodium"]
 
     return render_template(
         "nutrition.html",
@@ -88,53 +66,78 @@ def nutrition_history():
     if not session.get("user"):
         return redirect("/login")
 
-    data = load_user_data()
+    data = get_user_data()
     session_user = session["user"]
     user = get_target_user(data, session_user)
-    meals = user.get('meals', [])
 
-    # Nested dictionary: Month -> Day -> Totals/Meals
+    if not user:
+        return redirect("/home")
+
+    # Precomputed totals, kept up to date as meals are logged/deleted
+    rollups = get_rollups(data, user)
+
+    # One month per page, newest first
+    months = sorted(rollups["monthly"], reverse=True)
+    month = request.args.get("month")
+    if month not in months:
+        month = months[0] if months else None
+
+    newer_month = older_month = None
     grouped_history = {}
 
-    for meal in meals:
-        if "timestamp" in meal:
-            # Example timestamp: "April 20, 2026 at 05:10:38 PM"
-            parts = meal["timestamp"].split(" ")
-            
-            # parts[0] is Month, parts[1] is Day, parts[2] is Year
-            month_year = f"{parts[0]} {parts[2]}" 
-            full_date = f"{parts[0]} {parts[1]} {parts[2]}"
-
-            # Ensure the Month exists
-            if month_year not in grouped_history:
-                grouped_history[month_year] = {}
-            
-            # Ensure the Day exists and initialize all 5 tracking keys
-            if full_date not in grouped_history[month_year]:
-                grouped_history[month_year][full_date] = {
-                    "meals": [],
-                    "total_cal": 0.0,
-                    "total_prot": 0.0,
-                    "total_chol": 0.0,
-                    "total_sug": 0.0,
-                    "total_sod": 0.0
-                }
-            
-            day_data = grouped_history[month_year][full_date]
-            
-            # Append the meal to the list
-            day_data["meals"].append(meal)
-            
-            # Aggregate all nutrient totals (using .get with a default of 0 for safety)
-            day_data["total_cal"] += float(meal.get("calories", 0))
-            day_data["total_prot"] += float(meal.get("protein", 0))
-            day_data["total_chol"] += float(meal.get("cholesterol", 0))
-            day_data["total_sug"] += float(meal.get("sugar", 0))
-            day_data["total_sod"] += float(meal.get("sodium", 0))
+    if month:
+        i = months.index(month)
+        newer_month = months[i - 1] if i > 0 else None
+        older_month = months[i + 1] if i + 1 < len(months) else None
+
+        # Nested dictionary: Month -> Day -> Totals
+        month_label = datetime.strptime(month, "%Y-%m").strftime("%B %Y")
+        grouped_history[month_label] = {}
+
+        for day in sorted(d for d in rollups["daily"] if d.startswith(month)):
+            totals = rollups["daily"][day]
+            day_label = datetime.strptime(day, "%Y-%m-%d").strftime("%B %d, %Y")
+            grouped_history[month_label][day_label] = {
+                "meal_count": totals["meals"],
+                "total_cal": round(totals["calories"], 1),
+                "total_prot": round(totals["protein"], 1),
+                "total_chol": round(totals["cholesterol"], 1),
+                "total_sug": round(totals["sugar"], 1),
+                "total_sod": round(totals["sodium"], 1)
+            }
 
     return render_template(
         "history.html", 
         grouped_history=grouped_history, 
+        newer_month=newer_month,
+        older_month=older_month,
         viewer=session_user,
         user=user
-    )
\ No newline at end of file
+    )
+
+@nutrition_bp.route("/nutrition/trends")
+def nutrition_trends_route():
+    """7/30/90-day averages, goal adherence and over-goal days as JSON (?start=&end= as YYYY-MM-DD)."""
+    if not session.get("user"):
+        return redirect("/login")
+
+    data = get_user_data()
+    user = get_target_user(data, session["user"])
+
+    if not user:
+        return jsonify({"error": "No user to report on"}), 404
+
+    try:
+        start = date.fromisoformat(request.args["start"]) if request.args.get("start") else None
+        end = date.fromisoformat(request.args["end"]) if request.args.get("end") else None
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    end = end or date.today()
+    if start and start > end:
+        return jsonify({"error": "start must be before end"}), 400
+
+    if start and (end - start).days + 1 > MAX_TREND_DAYS:
+        return jsonify({"error": f"Range can be at most {MAX_TREND_DAYS} days"}), 400
+
+    return jsonify(nutrition_trends(data, user, start, end))
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, session, redirect, request
-from Backend.user_loader import load_user_data, save_user_data, load_elderly_users_with_caretakers
+from Backend.user_loader import attach_caretakers
+from services.data_context import get_user_data
 
 profile_bp = Blueprint("profile", __name__)
 
@@ -8,8 +9,7 @@ def profile():
     if not session.get("user"):
         return redirect("/login")
 
-    data = load_user_data()
-    users = load_elderly_users_with_caretakers()
+    users = attach_caretakers(get_user_data())
 
     return render_template(
         "profile.html",
@@ -1,35 +1,11 @@
 from flask import Blueprint, render_template, session, redirect, request, url_for
-from Backend.user_loader import load_user_data
+from services.data_context import get_user_data
 from Backend.recipe import generate_recipe
-import json
+from Backend.storage import load_recipes, update_recipes
+from utils.helpers import get_target_user
 
 recipes_bp = Blueprint("recipes", __name__)
 
-FILE = "data/saved_recipes.json"
-
-
-# =========================
-# USER CONTEXT
-# =========================
-def get_target_user(data, session_user):
-    role = session_user.get("role", "").lower()
-
-    if role == "caretaker":
-        return next(
-            (u for u in data.get("elderly_users", [])
-             if u.get("caretaker_id") == session_user["id"]),
-            None
-        )
-
-    elif role == "elderly":
-        return next(
-            (u for u in data.get("elderly_users", [])
-             if u["id"] == session_user["id"]),
-            None
-        )
-
-    return None
-
 
 # =========================
 # MAIN RECIPES PAGE
@@ -40,14 +16,11 @@ def recipes():
         return redirect("/login")
 
     session_user = session["user"]
-    data = load_user_data()
+    data = get_user_data()
 
     target_user = get_target_user(data, session_user)
 
-    with open(FILE) as f:
-        file_data = json.load(f)
-
-    recipes_list = file_data.get("recipes", [])
+    recipes_list = load_recipes()
 
     # =====================
     # ADD RECIPE
@@ -87,10 +60,7 @@ def recipes():
         steps_text = request.form.get("steps", "")
         new_recipe["steps"] = [s.strip() for s in steps_text.splitlines() if s.strip()]
 
-        recipes_list.append(new_recipe)
-
-        with open(FILE, "w") as f:
-            json.dump({"recipes": recipes_list}, f, indent=4)
+        update_recipes(lambda recipes_list: recipes_list.append(new_recipe))
 
         return redirect("/recipes")
 
@@ -108,15 +78,6 @@ def update_recipe():
 
     index = int(request.form.get("index"))
 
-    with open(FILE) as f:
-        data = json.load(f)
-
-    recipes_list = data.get("recipes", [])
-
-    # safety check
-    if index < 0 or index >= len(recipes_list):
-        return redirect(url_for("recipes.recipes"))
-
     # time conversion
     value = int(request.form.get("estimated_time_value", 0))
     unit = request.form.get("estimated_time_unit", "min")
@@ -148,12 +109,13 @@ def update_recipe():
     steps_text = request.form.get("steps", "")
     updated_recipe["steps"] = [s.strip() for s in steps_text.splitlines() if s.strip()]
 
-    # replace recipe
-    recipes_list[index] = updated_recipe
+    # replace recipe (the index is checked again under the lock, in case
+    # another worker removed a recipe meanwhile)
+    def replace(recipes_list):
+        if 0 <= index < len(recipes_list):
+            recipes_list[index] = updated_recipe
 
-    # save
-    with open(FILE, "w") as f:
-        json.dump({"recipes": recipes_list}, f, indent=4)
+    update_recipes(replace)
 
     return redirect(url_for("recipes.recipes"))
 
@@ -165,16 +127,11 @@ def delete_recipe(index):
     if not session.get("user"):
         return redirect("/login")
 
-    with open(FILE) as f:
-        data = json.load(f)
-
-    recipes_list = data.get("recipes", [])
-
-    if 0 <= index < len(recipes_list):
-        recipes_list.pop(index)
+    def delete(recipes_list):
+        if 0 <= index < len(recipes_list):
+            recipes_list.pop(index)
 
-    with open(FILE, "w") as f:
-        json.dump({"recipes": recipes_list}, f, indent=4)
+    update_recipes(delete)
 
     return redirect(url_for("recipes.recipes"))
 
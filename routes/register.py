@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect
-from Backend.user_loader import load_user_data, save_user_data, username_exists
+from Backend.user_loader import username_exists
+from services.data_context import get_user_data, add_user, edit_user
 from extensions import bcrypt
 
 register_bp = Blueprint("register", __name__)
@@ -15,7 +16,7 @@ def register_elderly():
         if username_exists(username):
             return "Username already exists"
 
-        data = load_user_data()
+        data = get_user_data()
         new_id = max([e["id"] for e in data.get("elderly_users", [])] + [0]) + 1
 
         new_elderly = {
@@ -41,8 +42,7 @@ def register_elderly():
             "caretaker_id": None
         }
 
-        data.setdefault("elderly_users", []).append(new_elderly)
-        save_user_data(data)
+        add_user(new_elderly)
         return redirect("/login")
 
     return render_template("register_elderly.html")
@@ -50,7 +50,7 @@ def register_elderly():
 
 @register_bp.route("/register/caretaker", methods=["GET", "POST"])
 def register_caretaker():
-    data = load_user_data()
+    data = get_user_data()
     elderly_users = data.get("elderly_users", [])
 
     if request.method == "POST":
@@ -63,6 +63,7 @@ def register_caretaker():
 
         new_caretaker = {
             "id": new_id,
+            "role": "caretaker",
             "name": request.form["name"],
             "association": request.form["association"],
             "account": {"username": username, "password": bcrypt.generate_password_hash(request.form["password"]).decode('utf-8')},
@@ -70,13 +71,11 @@ def register_caretaker():
             "elderly_user_ids": selected_elderly_ids
         }
 
-        data.setdefault("caretaker_users", []).append(new_caretaker)
+        add_user(new_caretaker)
 
         for elderly in data["elderly_users"]:
             if elderly["id"] in selected_elderly_ids:
-                elderly["caretaker_id"] = new_id
-
-        save_user_data(data)
+                edit_user(elderly)["caretaker_id"] = new_id
         return redirect("/login")
 
     return render_template("register_caretaker.html", elderly_users=elderly_users)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, session, redirect, request, url_for
-from Backend.user_loader import load_user_data, save_user_data
+from services.data_context import get_user_data, edit_user
+from services.recipe_scheduler import get_meal_times
 from utils.helpers import get_target_user
 from extensions import bcrypt
 
@@ -12,19 +13,16 @@ def settings():
         return redirect("/login")
 
     session_user = session.get("user", {})
-    data = load_user_data()
+    data = get_user_data()
 
     user = get_target_user(data, session_user)
 
     if not user:
         return redirect("/home")
 
-    prefs = user.setdefault("preferences", {})
-    meal_times = prefs.setdefault("meal_times", {
-        "breakfast": {"hour": 8, "minute": 0},
-        "lunch": {"hour": 12, "minute": 0},
-        "dinner": {"hour": 18, "minute": 0}
-    })
+    # Read-only here: the cached user is shared with other requests
+    prefs = user.get("preferences", {})
+    meal_times = get_meal_times(user)
     cuisines = [
         "Italian", "Chinese", "Mexican", "Indian",
         "American", "Mediterranean", "Japanese"
@@ -33,6 +31,8 @@ def settings():
     tab = request.args.get("tab", "meal")
 
     if request.method == "POST":
+        user = edit_user(user)
+        prefs = user.setdefault("preferences", {})
 
         # ---------------------
         # Privacy
@@ -69,7 +69,6 @@ def settings():
             # ✅ DARK MODE (moved here for simplicity)
             prefs["dark_mode"] = "dark_mode" in request.form
 
-        save_user_data(data)
         return redirect(url_for("settings.settings", tab=tab))
 
     return render_template(
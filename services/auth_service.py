@@ -1,12 +1,10 @@
-from Backend.user_loader import load_user_data
+from Backend.user_loader import find_user_by_username
 from extensions import bcrypt
 
 def check_login(username, password):
-    data = load_user_data()
+    user = find_user_by_username(username)
 
-    for user in data.get("elderly_users", []) + data.get("caretaker_users", []):
-        if user["account"]["username"] == username:
-            if bcrypt.check_password_hash(user["account"]["password"], password):
-                return user
+    if user and bcrypt.check_password_hash(user["account"]["password"], password):
+        return user
 
     return None
\ No newline at end of file
@@ -0,0 +1,84 @@
+from copy import deepcopy
+from flask import g
+from Backend.user_loader import load_user_data_with_stamp, save_user_data
+
+# ----- Request-scoped user data ----- #
+# Each request loads the user JSON at most once and writes it back at most
+# once, at teardown, if anything changed. get_user_data() returns the shared,
+# process-wide cached copy, which must be treated as read-only; routes that
+# change a user go through edit_user()/add_user(), which give the request its
+# own copies so nothing leaks to other requests unless it is saved.
+
+
+def get_user_data():
+    """Return the user data for this request, loading it on first use."""
+    if "user_data" not in g:
+        g.user_data, g.user_data_stamp = load_user_data_with_stamp()
+        g.dirty_users = set()
+        g.edited_users = {}
+    return g.user_data
+
+
+def _private_data():
+    # Swap in a per-request document (new dict and user lists, same user
+    # objects) the first time this request changes something
+    data = get_user_data()
+    if not g.get("user_data_private"):
+        data = g.user_data = {
+            **data,
+            "elderly_users": list(data.get("elderly_users", [])),
+            "caretaker_users": list(data.get("caretaker_users", []))
+        }
+        g.user_data_private = True
+    return data
+
+
+def _list_name(user):
+    return "caretaker_users" if user.get("role") == "caretaker" else "elderly_users"
+
+
+def edit_user(user):
+    """
+    Return this request's own copy of user to change; it is saved at
+    teardown. Call it before changing anything.
+    """
+    data = _private_data()
+    key = (user.get("role"), user["id"])
+
+    copy = g.edited_users.get(key)
+    if copy is None:
+        copy = g.edited_users[key] = deepcopy(user)
+        users = data[_list_name(user)]
+        for i, u in enumerate(users):
+            if (u.get("role"), u["id"]) == key:
+                users[i] = copy
+                break
+
+    g.dirty_users.add(key)
+    return copy
+
+
+def add_user(user):
+    """Add a newly registered user; it is saved at teardown."""
+    data = _private_data()
+    key = (user.get("role"), user["id"])
+    data[_list_name(user)].append(user)
+    g.edited_users[key] = user
+    g.dirty_users.add(key)
+
+
+def flush_user_data(exception=None):
+    """Write back user data once if the request changed anything."""
+    dirty = g.pop("dirty_users", None)
+    data = g.pop("user_data", None)
+    stamp = g.pop("user_data_stamp", None)
+    g.pop("edited_users", None)
+    g.pop("user_data_private", None)
+
+    if exception is None and dirty:
+        # Only the dirty users are written over whatever is on disk now
+        save_user_data(data, dirty=dirty, stamp=stamp)
+
+
+def init_app(app):
+    app.teardown_request(flush_user_data)
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+import numpy as np
+from Backend.user_loader import get_derived, register_meal_hook
+from services.nutrition_service import NUTRIENTS, get_sodium_goal, get_sugar_goal
+from services.nutrition_rollups import get_rollups
+
+# ----- Columnar nutrition analytics ----- #
+# A user's history as NumPy columns: one sorted array of day ordinals and a
+# (days x nutrients) matrix of daily totals, in NUTRIENTS order. Built from the
+# daily rollups (so it costs O(days), not O(meals)) and cached until the next
+# meal change; range queries below are then pure array maths.
+
+NUTRIENT_KEYS = list(NUTRIENTS)
+TREND_WINDOWS = (7, 30, 90)
+# Longest start..end span a trends request may ask for (the response is one row per day)
+MAX_TREND_DAYS = 2 * 366
+
+
+def _build_columns(rollups):
+    days = sorted(rollups["daily"])
+    ordinals = np.fromiter(
+        (date.fromisoformat(d).toordinal() for d in days), dtype=np.int64, count=len(days)
+    )
+    matrix = np.array(
+        [[rollups["daily"][d][k] for k in NUTRIENT_KEYS] for d in days], dtype=np.float64
+    ).reshape(len(days), len(NUTRIENT_KEYS))
+    return ordinals, matrix
+
+
+def get_columns(data, user):
+    """Return (day_ordinals, daily_totals) arrays for one user."""
+    rollups = get_rollups(data, user)
+    key = ("columns", user.get("role"), user["id"])
+    return get_derived(data, key, lambda: _build_columns(rollups))
+
+
+def _on_meal_change(derived, user, added, removed):
+    derived.pop(("columns", user.get("role"), user["id"]), None)
+
+
+register_meal_hook(_on_meal_change)
+
+
+def dense_range(ordinals, matrix, start, end):
+    """Daily totals for every day start..end (dates), zero-filled, as a (days x nutrients) array."""
+    if start > end:
+        raise ValueError(f"start {start} is after end {end}")
+    first, last = start.toordinal(), end.toordinal()
+    dense = np.zeros((last - first + 1, matrix.shape[1]))
+
+    lo, hi = np.searchsorted(ordinals, [first, last + 1])
+    dense[ordinals[lo:hi] - first] = matrix[lo:hi]
+    return dense
+
+
+def moving_average(dense, window):
+    """Trailing mean over `window` days (shorter at the start of the range)."""
+    csum = np.cumsum(dense, axis=0)
+    shifted = np.zeros_like(csum)
+    shifted[window:] = csum[:-window]
+    counts = np.minimum(np.arange(1, len(dense) + 1), window)[:, None]
+    return (csum - shifted) / counts
+
+
+def nutrition_trends(data, user, start=None, end=None, windows=TREND_WINDOWS):
+    """
+    Moving averages, percent-of-goal adherence and over-goal days for one
+    user between start and end (dates; defaults to the last 90 days).
+    Raises ValueError if start is after end.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=max(windows) - 1)
+    if start > end:
+        raise ValueError(f"start {start} is after end {end}")
+
+    ordinals, matrix = get_columns(data, user)
+    dense = dense_range(ordinals, matrix, start, end)
+
+    goals = np.array([NUTRIENTS[k](user) for k in NUTRIENT_KEYS], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adherence = np.where(goals > 0, dense / goals * 100, 0.0)
+
+    days = [(start + timedelta(days=i)).isoformat() for i in range(len(dense))]
+    sodium = dense[:, NUTRIENT_KEYS.index("sodium")]
+    sugar = dense[:, NUTRIENT_KEYS.index("sugar")]
+
+    def columns(arr):
+        return {k: np.round(arr[:, i], 1).tolist() for i, k in enumerate(NUTRIENT_KEYS)}
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": days,
+        "totals": columns(dense),
+        "moving_averages": {str(w): columns(moving_average(dense, w)) for w in windows},
+        "adherence_pct": columns(adherence),
+        "average_adherence_pct": dict(zip(NUTRIENT_KEYS, np.round(adherence.mean(axis=0), 1).tolist())),
+        "over_goal_days": {
+            "sodium": [days[i] for i in np.flatnonzero(sodium > get_sodium_goal(user))],
+            "sugar": [days[i] for i in np.flatnonzero(sugar > get_sugar_goal(user))]
+        }
+    }
@@ -0,0 +1,68 @@
+from datetime import datetime
+from Backend.user_loader import get_derived, register_meal_hook
+from services.nutrition_service import NUTRIENTS
+
+# ----- Daily / monthly nutrition rollups ----- #
+# Per-user totals keyed by "YYYY-MM-DD" and "YYYY-MM". They are built once per
+# cached data version and then kept up to date as meals are logged or deleted,
+# so the history page never has to walk the whole meal list.
+
+TIMESTAMP_FORMATS = ("%B %d, %Y at %I:%M:%S %p", "%B %d, %Y at %I:%M %p")
+
+
+def meal_day(meal):
+    """Return the meal's "YYYY-MM-DD" day, from its date or its timestamp."""
+    if meal.get("date"):
+        return meal["date"]
+
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(meal.get("timestamp", ""), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _add(bucket, meal, sign):
+    bucket["meals"] += sign
+    for key in NUTRIENTS:
+        bucket[key] += sign * float(meal.get(key) or 0)
+
+
+def _fold(rollups, meal, sign=1):
+    day = meal_day(meal)
+    if not day:
+        return
+
+    for period, key in (("daily", day), ("monthly", day[:7])):
+        buckets = rollups[period]
+        bucket = buckets.setdefault(key, {"meals": 0, **dict.fromkeys(NUTRIENTS, 0.0)})
+        _add(bucket, meal, sign)
+        if bucket["meals"] <= 0:
+            del buckets[key]
+
+
+def build_rollups(meals):
+    rollups = {"daily": {}, "monthly": {}}
+    for meal in meals:
+        _fold(rollups, meal)
+    return rollups
+
+
+def get_rollups(data, user):
+    """Return {"daily": {...}, "monthly": {...}} totals for one user."""
+    key = ("rollups", user.get("role"), user["id"])
+    return get_derived(data, key, lambda: build_rollups(user.get("meals", [])))
+
+
+def _on_meal_change(derived, user, added, removed):
+    rollups = derived.get(("rollups", user.get("role"), user["id"]))
+    if rollups is None:
+        return
+    for meal in added:
+        _fold(rollups, meal)
+    for meal in removed:
+        _fold(rollups, meal, -1)
+
+
+register_meal_hook(_on_meal_change)
@@ -1,19 +1,16 @@
-from datetime import datetime
+from datetime import date, datetime
 
 # Helper to get today's date string once
 def get_today():
     return datetime.now().strftime("%Y-%m-%d")
 
+# calorie goal from the profile, based on a 2000 calorie diet by default
+def get_calorie_goal(user):
+    return user.get("daily_calories", 2000)
+
 # tracks calories based on a 2000 calorie diet
 def track_calories(user):
-    goal = user.get("daily_calories", 2000)
-    meals = user.get("meals", [])
-    today = get_today()
-
-    consumed = sum(meal.get("calories", 0) for meal in meals if meal.get("date") == today)
-    remaining = goal - consumed
-
-    return {"goal": goal, "consumed": consumed, "remaining": remaining}
+    return aggregate_nutrition(user)["calories"]
 
 # determines protein by body weight (lbs x 1.2)
 def get_protein_goal(user):
@@ -22,14 +19,7 @@ def get_protein_goal(user):
     return round(protein_goal, 1)
 
 def track_protein(user):
-    goal = get_protein_goal(user)
-    meals = user.get("meals", [])
-    today = get_today()
-
-    consumed = sum(meal.get("protein", 0) for meal in meals if meal.get("date") == today)
-    remaining = goal - consumed
-
-    return {"goal": goal, "consumed": consumed, "remaining": remaining}
+    return aggregate_nutrition(user)["protein"]
 
 # cholestrol for user
 def get_cholesterol_goal(user):
@@ -42,14 +32,7 @@ def get_cholesterol_goal(user):
     return 300
 
 def track_cholesterol(user):
-    goal = get_cholesterol_goal(user)
-    meals = user.get("meals", [])
-    today = get_today()
-
-    consumed = sum(meal.get("cholesterol", 0) for meal in meals if meal.get("date") == today)
-    remaining = goal - consumed
-
-    return {"goal": goal, "consumed": consumed, "remaining": remaining}
+    return aggregate_nutrition(user)["cholesterol"]
 
 # if male -> 36 g, female -> 25 g
 def get_sugar_goal(user):
@@ -57,25 +40,49 @@ def get_sugar_goal(user):
     return 36 if gender == "male" else 25
 
 def track_sugar(user):
-    goal = get_sugar_goal(user)
-    meals = user.get("meals", [])
-    today = get_today()
-
-    consumed = sum(meal.get("sugar", 0) for meal in meals if meal.get("date") == today)
-    remaining = goal - consumed
-
-    return {"goal": goal, "consumed": consumed, "remaining": remaining}
+    return aggregate_nutrition(user)["sugar"]
 
 # 1300 mg for any person over 50
 def get_sodium_goal(user):
     return 1300
 
 def track_sodium(user):
-    goal = get_sodium_goal(user)
-    meals = user.get("meals", [])
-    today = get_today()
-
-    consumed = sum(meal.get("sodium", 0) for meal in meals if meal.get("date") == today)
-    remaining = goal - consumed
-
-    return {"goal": goal, "consumed": consumed, "remaining": remaining}
\ No newline at end of file
+    return aggregate_nutrition(user)["sodium"]
+
+# ----- Nutrient registry ----- #
+# Meal field -> goal function. Every aggregate below covers all of these in one
+# pass over the meals, so tracking a new nutrient is one line here.
+NUTRIENTS = {
+    "calories": get_calorie_goal,
+    "protein": get_protein_goal,
+    "cholesterol": get_cholesterol_goal,
+    "sugar": get_sugar_goal,
+    "sodium": get_sodium_goal,
+}
+
+def _as_date_str(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+# totals every registered nutrient for meals dated start..end (inclusive)
+def aggregate_nutrition(user, start=None, end=None):
+    """
+    Single pass over user["meals"]. start/end are "YYYY-MM-DD" strings or dates
+    and both default to today; goals are daily goals times the days in range.
+    """
+    start = _as_date_str(start) or get_today()
+    end = _as_date_str(end) or max(start, get_today())
+    days = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+
+    consumed = dict.fromkeys(NUTRIENTS, 0)
+    for meal in user.get("meals", []):
+        meal_date = meal.get("date")
+        if meal_date and start <= meal_date <= end:
+            for key in NUTRIENTS:
+                consumed[key] += meal.get(key, 0)
+
+    totals = {}
+    for key, goal_for in NUTRIENTS.items():
+        goal = goal_for(user) * days
+        totals[key] = {"goal": goal, "consumed": consumed[key], "remaining": goal - consumed[key]}
+
+    return totals
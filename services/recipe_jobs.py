@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from Backend.recipe import generate_recipe, parse_recipe_response
+from Backend.local_recipe import generate_local_recipe
+
+# ----- Background recipe generation ----- #
+# /generate_recipe submits a job to a small in-process worker pool and returns
+# straight away, so a slow model call never holds a Flask worker. Jobs (and
+# their results, once finished) are kept in memory, newest last, so the status
+# endpoint can be polled and a finished recipe renders without waiting.
+
+RECIPE_JOB_WORKERS = int(os.getenv("RECIPE_JOB_WORKERS", "4"))
+RECIPE_LATENCY_BUDGET = float(os.getenv("RECIPE_LATENCY_BUDGET", "8"))
+MAX_STORED_JOBS = 200
+# Live (SSE) generation holds a Flask thread for the whole model call, so only
+# this many run at once; past that the page falls back to a background job.
+RECIPE_STREAM_SLOTS = int(os.getenv("RECIPE_STREAM_SLOTS", "4"))
+
+_executor = None
+_llm_executor = None
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_stream_slots = threading.BoundedSemaphore(RECIPE_STREAM_SLOTS)
+
+
+def _get_executor():
+    global _executor
+
+    with _jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RECIPE_JOB_WORKERS,
+                                           thread_name_prefix="recipe-job")
+        return _executor
+
+
+def _get_llm_executor():
+    # Model calls run on their own pool so a job can stop waiting on one
+    global _llm_executor
+
+    with _jobs_lock:
+        if _llm_executor is None:
+            _llm_executor = ThreadPoolExecutor(max_workers=RECIPE_JOB_WORKERS,
+                                               thread_name_prefix="recipe-llm")
+        return _llm_executor
+
+
+def _update(job_id, **fields):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+
+
+def _generate(meal_type, user):
+    """
+    (recipe, source) from the model, hedged by the local generator: if the
+    model errors or takes longer than RECIPE_LATENCY_BUDGET seconds, the local
+    recipe is used. A slow model call keeps running and still fills the
+    recipe cache for next time.
+    """
+    if os.getenv("RECIPE_CLIENT") == "local":
+        return generate_local_recipe(meal_type, user), "local"
+
+    future = _get_llm_executor().submit(generate_recipe, meal_type, user)
+    try:
+        return parse_recipe_response(future.result(timeout=RECIPE_LATENCY_BUDGET)), "ai"
+    except TimeoutError:
+        print("RECIPE JOB: model over latency budget, using local recipe")
+    except Exception as e:
+        print("RECIPE JOB: model failed, using local recipe:", e)
+    return generate_local_recipe(meal_type, user), "local"
+
+
+def _run(job_id, meal_type, user):
+    _update(job_id, status="running", progress="Generating recipe...", started=time.time())
+    try:
+        recipe, source = _generate(meal_type, user)
+        if recipe is None:
+            raise ValueError("no safe, in-stock ingredients to build a recipe from")
+        _update(job_id, status="done", progress="Recipe ready", result=recipe,
+                source=source, finished=time.time())
+    except Exception as e:
+        print("RECIPE JOB ERROR:", job_id, e)
+        _update(job_id, status="failed", progress="Recipe generation failed",
+                error=str(e), finished=time.time())
+
+
+def _make_room():
+    # Drop the oldest finished jobs to leave a free slot; queued and running
+    # ones are never dropped
+    finished = [job_id for job_id, job in _jobs.items() if job["status"] in ("done", "failed")]
+    for job_id in finished[:max(0, len(_jobs) - MAX_STORED_JOBS + 1)]:
+        del _jobs[job_id]
+
+
+def submit_recipe_job(owner, meal_type, user):
+    """
+    Queue a recipe generation for user; returns the job id immediately, or
+    None if MAX_STORED_JOBS jobs are already queued or running.
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "owner": owner,
+        "meal_type": meal_type,
+        "status": "queued",
+        "progress": "Waiting for a free worker...",
+        "created": time.time(),
+        "result": None,
+        "source": None,
+        "error": None
+    }
+
+    with _jobs_lock:
+        _make_room()
+        if len(_jobs) >= MAX_STORED_JOBS:
+            return None
+        _jobs[job_id] = job
+
+    _get_executor().submit(_run, job_id, meal_type, user)
+    return job_id
+
+
+def get_job(job_id, owner):
+    """A snapshot of the job, or None if it is unknown or belongs to someone else."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None or job["owner"] != owner:
+            return None
+
+        snapshot = dict(job)
+        if job["status"] == "queued":
+            snapshot["queue_position"] = sum(
+                1 for other in _jobs.values()
+                if other["status"] == "queued" and other["created"] <= job["created"]
+            )
+        return snapshot
+
+
+def try_stream_slot():
+    """Claim one of the live streaming slots without waiting. True if claimed."""
+    return _stream_slots.acquire(blocking=False)
+
+
+def release_stream_slot():
+    _stream_slots.release()
@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from Backend.recipe import generate_recipe, recipe_prompt_inputs, parse_recipe_response
+from Backend.persistence import try_file_lock
+from Backend.recipe_cache import cache_key, get_recipe_cache
+from Backend.user_loader import load_elderly_users
+
+# ----- Recipe pre-generation ----- #
+# Shortly before each elderly user's breakfast/lunch/dinner, generate their
+# recipe in the background (a few at a time) so /meals can show it instantly.
+# Results live in the content-addressed recipe cache, so a change to the
+# inventory or to the user's restrictions changes the key and the stale
+# recipe is simply never looked up again.
+#
+#   RECIPE_PREGEN=1 starts the loop with the app, or run it directly:
+#   python -m services.recipe_scheduler [--once]
+
+PREGEN_LEAD_MINUTES = 45
+PREGEN_INTERVAL_SECONDS = 300
+PREGEN_WORKERS = 2
+
+DEFAULT_MEAL_TIMES = {
+    "breakfast": {"hour": 8, "minute": 0},
+    "lunch": {"hour": 12, "minute": 0},
+    "dinner": {"hour": 18, "minute": 0}
+}
+
+
+def get_meal_times(user):
+    """Meal times from settings, then the profile (set at registration), then defaults."""
+    return (
+        user.get("preferences", {}).get("meal_times")
+        or user.get("meal_times")
+        or DEFAULT_MEAL_TIMES
+    )
+
+
+def next_meal(user, now=None):
+    """(meal_type, datetime) of the user's next meal after now."""
+    now = now or datetime.now()
+    upcoming = []
+    for meal_type, t in get_meal_times(user).items():
+        at = now.replace(hour=int(t["hour"]), minute=int(t["minute"]), second=0, microsecond=0)
+        if at <= now:
+            at += timedelta(days=1)
+        upcoming.append((at, meal_type))
+    at, meal_type = min(upcoming)
+    return meal_type, at
+
+
+def due_meals(user, now=None, lead_minutes=PREGEN_LEAD_MINUTES):
+    """Meal types starting within the next lead_minutes."""
+    now = now or datetime.now()
+    horizon = now + timedelta(minutes=lead_minutes)
+    due = []
+    for meal_type, t in get_meal_times(user).items():
+        at = now.replace(hour=int(t["hour"]), minute=int(t["minute"]), second=0, microsecond=0)
+        if at <= now:
+            at += timedelta(days=1)
+        if at <= horizon:
+            due.append(meal_type)
+    return due
+
+
+def peek_recipe(meal_type, user):
+    """The recipe already generated for these inputs, or None. Never calls the model."""
+    raw = get_recipe_cache().peek(cache_key(recipe_prompt_inputs(meal_type, user)))
+    if raw is None:
+        return None
+    try:
+        return parse_recipe_response(raw)
+    except ValueError:
+        return None
+
+
+def pregenerate_due(now=None, workers=PREGEN_WORKERS):
+    """Generate recipes for every meal due soon that is not cached yet."""
+    pending = []
+    for user in load_elderly_users():
+        for meal_type in due_meals(user, now):
+            if peek_recipe(meal_type, user) is None:
+                pending.append((meal_type, user))
+
+    if not pending:
+        return 0
+
+    def run(job):
+        meal_type, user = job
+        try:
+            generate_recipe(meal_type, user)
+            return True
+        except Exception as e:
+            print("PREGEN ERROR:", user.get("id"), meal_type, e)
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recipe-pregen") as pool:
+        generated = sum(pool.map(run, pending))
+
+    print(f"PREGEN: generated {generated}/{len(pending)} recipes")
+    return generated
+
+
+# ----- Background loop ----- #
+# Only one process runs the loop: it holds SCHEDULER_LOCK while it runs, and
+# other web workers (or a second CLI) skip starting theirs.
+
+SCHEDULER_LOCK = "data/recipe_scheduler"
+
+_scheduler = None
+_stop = threading.Event()
+
+
+def _loop(interval, lock):
+    try:
+        while not _stop.is_set():
+            try:
+                pregenerate_due()
+            except Exception as e:
+                print("PREGEN LOOP ERROR:", e)
+            _stop.wait(interval)
+    finally:
+        lock.close()
+
+
+def start_scheduler(interval=PREGEN_INTERVAL_SECONDS):
+    """
+    Start the pre-generation loop in a daemon thread, unless it already runs
+    here or in another process (then returns None).
+    """
+    global _scheduler
+
+    if _scheduler is not None and _scheduler.is_alive():
+        return _scheduler
+
+    lock = try_file_lock(SCHEDULER_LOCK)
+    if lock is None:
+        print("PREGEN: scheduler already running in another process")
+        return None
+
+    _stop.clear()
+    _scheduler = threading.Thread(target=_loop, args=(interval, lock), daemon=True,
+                                  name="recipe-scheduler")
+    _scheduler.start()
+    return _scheduler
+
+
+def stop_scheduler():
+    _stop.set()
+
+
+def init_app(app):
+    if os.getenv("RECIPE_PREGEN") == "1":
+        start_scheduler()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate recipes ahead of users' meal times.")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        pregenerate_due()
+    else:
+        lock = try_file_lock(SCHEDULER_LOCK)
+        if lock is None:
+            sys.exit("PREGEN: scheduler already running in another process")
+        _loop(PREGEN_INTERVAL_SECONDS, lock)
@@ -0,0 +1,72 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.nutrition_analytics import nutrition_trends
+
+# Inverted or oversized ranges must be rejected up front: the trends maths
+# builds one row per day and fails on a negative span.
+
+
+def _user():
+    return {
+        "id": 999,
+        "role": "elderly",
+        "weight_lbs": 150,
+        "meals": [{"date": "2026-01-05", "calories": 500.0, "protein": 20.0,
+                   "cholesterol": 0.0, "sugar": 10.0, "sodium": 800.0}]
+    }
+
+
+def test_trends_rejects_start_after_end():
+    user = _user()
+    data = {"elderly_users": [user]}
+
+    with pytest.raises(ValueError):
+        nutrition_trends(data, user, start=date.today() + timedelta(days=30))
+    with pytest.raises(ValueError):
+        nutrition_trends(data, user, start=date(2026, 2, 1), end=date(2026, 1, 1))
+
+
+def test_trends_range():
+    user = _user()
+    trends = nutrition_trends({"elderly_users": [user]}, user, date(2026, 1, 1), date(2026, 1, 10))
+
+    assert len(trends["days"]) == 10
+    assert trends["totals"]["calories"][4] == 500.0
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # The app reads data/ relative to the working directory
+    monkeypatch.chdir(ROOT)
+    from app import create_app
+
+    client = create_app().test_client()
+    with client.session_transaction() as session:
+        session["user"] = {"id": 1, "role": "elderly", "name": "", "username": "margaret_t"}
+    return client
+
+
+@pytest.mark.parametrize("query", [
+    "start=2999-01-01",
+    "start=2026-02-01&end=2026-01-01",
+    "end=1900-01-01&start=1900-01-02",
+    "start=1900-01-01",
+    "start=1900-01-01&end=2026-01-01",
+    "start=bad",
+])
+def test_trends_route_rejects_bad_ranges(client, query):
+    assert client.get("/nutrition/trends?" + query).status_code == 400
+
+
+def test_trends_route_default_range(client):
+    res = client.get("/nutrition/trends")
+
+    assert res.status_code == 200
+    assert len(res.get_json()["days"]) == 90
@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+# create_app() must stay cheap: no model client or .env loading until the
+# first recipe is generated. Runs in a fresh interpreter so modules imported
+# by other tests don't count.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_BUDGET_SECONDS = 2.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "openai": "openai" in sys.modules,
+    "dotenv": "dotenv" in sys.modules
+}))
+"""
+
+
+def _probe():
+    env = dict(os.environ)
+    env.pop("RECIPE_PREGEN", None)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_create_app_is_fast_and_lazy():
+    probe = _probe()
+
+    assert probe["seconds"] < STARTUP_BUDGET_SECONDS, probe
+    assert not probe["openai"], "create_app() imported openai"
+    assert not probe["dotenv"], "create_app() imported dotenv"
@@ -1,38 +1,32 @@
-import json
+from Backend.user_loader import find_user, find_elderly_for_caretaker
+from utils.ingredient_index import get_ingredient_index
 
 def has_ingredients_for_recipe(recipe):
-    with open("data/sample_food.json") as f:
-        data = json.load(f)
-
-    inventory_names = [
-        item["product"]["name"].lower()
-        for item in data.get("items", [])
+    """Returns (has_all, missing) for one recipe against the current inventory."""
+    return get_ingredient_index().check_recipe(recipe)
+
+def check_recipes_availability(recipes):
+    """Availability of every recipe, checked against one shared inventory index."""
+    results = get_ingredient_index().check_recipes(recipes)
+    return [
+        {"recipe": recipe, "has_all": has_all, "missing": missing}
+        for recipe, (has_all, missing) in zip(recipes, results)
     ]
 
-    missing = []
-
-    for ing in recipe.get("ingredients", []):
-        name = ing["name"].lower()
-        if not any(inv in name or name in inv for inv in inventory_names):
-            missing.append(ing["name"])
-
-    return len(missing) == 0, missing
-
 def get_target_user(data, session_user):
-    role = session_user.get("role", "").lower()
+    """Returns the elderly user being viewed (caretaker or self)."""
+    role = (session_user.get("role") or "").lower()
 
     if role == "caretaker":
-        return next(
-            (u for u in data.get("elderly_users", [])
-             if u.get("caretaker_id") == session_user["id"]),
-            None
-        )
+        linked = find_elderly_for_caretaker(session_user["id"], data)
+        return linked[0] if linked else None
 
     elif role == "elderly":
-        return next(
-            (u for u in data.get("elderly_users", [])
-             if u["id"] == session_user["id"]),
-            None
-        )
+        return find_user("elderly", session_user["id"], data)
+
+    return None
 
-    return None
\ No newline at end of file
+def get_session_user(data, session_user):
+    """Returns the logged-in user's own record (elderly or caretaker)."""
+    role = (session_user.get("role") or "").lower()
+    return find_user(role, session_user["id"], data)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import threading
+from collections import deque
+from Backend.food_loader import get_food_catalog
+
+# ----- Inventory ingredient matching ----- #
+# An ingredient counts as in stock when an inventory name is a substring of
+# it ("chicken" in "chicken breast") or it is a substring of an inventory name
+# ("milk" in "whole milk"). Both directions are answered from one index built
+# per inventory version:
+#   - an Aho-Corasick automaton over the inventory names finds any name inside
+#     the ingredient in a single scan of the ingredient
+#   - the inventory names joined by newlines let "ingredient in some name" be
+#     one substring search
+
+
+def _normalize(name):
+    return " ".join(str(name).lower().split())
+
+
+class IngredientIndex:
+    def __init__(self, inventory_names, stamp=None):
+        self.stamp = stamp
+        names = {_normalize(n) for n in inventory_names}
+        self.has_empty_name = "" in names
+        names.discard("")
+        self.haystack = "\n".join(sorted(names))
+        self._results = {}
+        self._build_automaton(names)
+
+    def _build_automaton(self, names):
+        # goto[state] maps char -> state, fail[state] is the fallback state,
+        # out[state] is True when some name ends at (or via fail links) state
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [False]
+
+        for name in names:
+            state = 0
+            for ch in name:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(False)
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.out[state] = True
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] or self.out[self.fail[nxt]]
+
+    def _contains_inventory_name(self, text):
+        state = 0
+        for ch in text:
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            if self.out[state]:
+                return True
+        return False
+
+    def in_stock(self, ingredient_name):
+        name = _normalize(ingredient_name)
+        if name not in self._results:
+            self._results[name] = (
+                self.has_empty_name
+                or self._contains_inventory_name(name)
+                or (name in self.haystack if self.haystack else False)
+            )
+        return self._results[name]
+
+    def check_recipe(self, recipe):
+        """Return (has_all, missing_ingredient_names) for one recipe."""
+        missing = [
+            ing["name"] for ing in recipe.get("ingredients", [])
+            if not self.in_stock(ing["name"])
+        ]
+        return len(missing) == 0, missing
+
+    def check_recipes(self, recipes):
+        """Batch version of check_recipe, in the same order as recipes."""
+        return [self.check_recipe(r) for r in recipes]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ingredient_index():
+    """Return the shared IngredientIndex for the current inventory."""
+    global _index
+
+    catalog = get_food_catalog()
+    with _index_lock:
+        if _index is None or _index.stamp != catalog.stamp:
+            _index = IngredientIndex((f["name"] for f in catalog.foods), catalog.stamp)
+        return _index